@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Flood protection overhead per update.
+
+Journal (update_queue put + processor) ka cost bhi - yeh flood_guard se pehle
+har update par lagta hai. 'loop busy' = update ke dauran event loop kitna
+time doosre tasks ko nahi de paaya (journal writes thread mein hain, isliye
+yeh total se bahut kam hona chahiye).
+
+Run: python benchmarks/bench_flood.py
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop
+
+import bot
+import config
+import journal
+from ratelimit import TokenBucketLimiter
+
+UPDATES = 200_000
+
+def make_update(update_id, user_id):
+    user = {'id': user_id, 'is_bot': False, 'first_name': 'u'}
+    return Update.de_json({
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': 0,
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': user,
+            'text': '/buy',
+        },
+    }, None)
+
+def bench_limiter(label, user_ids):
+    limiter = TokenBucketLimiter(config.FLOOD_RATE, config.FLOOD_BURST, config.FLOOD_MAX_TRACKED_USERS)
+    start = time.perf_counter()
+    for user_id in user_ids:
+        limiter.allow(user_id)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed / len(user_ids) * 1e9:>8.0f} ns/update  (tracked={len(limiter)})")
+
+async def bench_guard(user_ids):
+    # Fresh limiters with large buckets so every update passes all checks
+    bot.flood_limiter = TokenBucketLimiter(1e9, 1e9, config.FLOOD_MAX_TRACKED_USERS)
+    updates = [make_update(i, user_id) for i, user_id in enumerate(user_ids)]
+    start = time.perf_counter()
+    for update in updates:
+        try:
+            await bot.flood_guard(update, None)
+        except ApplicationHandlerStop:
+            pass
+    elapsed = time.perf_counter() - start
+    print(f"{'flood_guard (allowed path)':<40} {elapsed / len(updates) * 1e9:>8.0f} ns/update")
+
+async def bench_journal(count):
+    with tempfile.TemporaryDirectory() as tmp:
+        config.RUNTIME_DB_PATH = os.path.join(tmp, 'runtime.db')
+        journal.init_journal()
+        queue = journal.JournalingUpdateQueue()
+        processor = journal.JournalingUpdateProcessor()
+        updates = [make_update(i, i % 1_000) for i in range(1, count + 1)]
+
+        async def handler():
+            pass
+
+        ticks = 0
+        running = True
+
+        async def ticker():
+            nonlocal ticks
+            while running:
+                await asyncio.sleep(0)
+                ticks += 1
+
+        tick_task = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        busy = 0.0
+        for update in updates:
+            # Sirf is task ke synchronous hisse ka time - awaits ke beech loop free hai
+            started = time.perf_counter()
+            ticks_before = ticks
+            await queue.put(update)
+            await processor.do_process_update(await queue.get(), handler())
+            if ticks == ticks_before:
+                busy += time.perf_counter() - started   # ek baar bhi yield nahi kiya
+        elapsed = time.perf_counter() - start
+        running = False
+        await tick_task
+        journal.close_journal()
+    print(f"{'journal put + process':<40} {elapsed / count * 1e6:>8.0f} us/update  "
+          f"(loop busy {busy / count * 1e6:.0f} us/update)")
+
+def main():
+    random.seed(1)
+    bench_limiter("1k active users", [random.randrange(1_000) for _ in range(UPDATES)])
+    bench_limiter("single spammer", [42] * UPDATES)
+    bench_limiter("200k distinct users (LRU eviction)", list(range(UPDATES)))
+    asyncio.run(bench_guard([random.randrange(1_000) for _ in range(UPDATES // 4)]))
+    asyncio.run(bench_journal(2_000))
+
+if __name__ == '__main__':
+    main()
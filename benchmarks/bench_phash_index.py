@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Screenshot hash index: lookup time vs index size.
+
+Run: python benchmarks/bench_phash_index.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import config
+import phash
+
+SIZES = [10_000, 50_000, 100_000, 300_000]
+QUERIES = 2_000
+
+def flip_bits(value, count):
+    for bit in random.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+def main():
+    random.seed(42)
+    max_distance = config.SCREENSHOT_DUPLICATE_DISTANCE
+    print(f"max_distance={max_distance}, queries={QUERIES}")
+    print(f"{'size':>10} {'build s':>9} {'hit us':>9} {'miss us':>9}")
+
+    for size in SIZES:
+        hashes = [random.getrandbits(64) for _ in range(size)]
+
+        start = time.perf_counter()
+        index = phash.HashIndex(max_distance)
+        for i, value in enumerate(hashes):
+            index.add(value, i)
+        build = time.perf_counter() - start
+
+        # Near-duplicates of stored hashes (must be found)
+        near = [flip_bits(random.choice(hashes), random.randint(0, max_distance))
+                for _ in range(QUERIES)]
+        start = time.perf_counter()
+        found = sum(1 for value in near if index.find(value))
+        hit_us = (time.perf_counter() - start) / QUERIES * 1e6
+        assert found == QUERIES, f"missed {QUERIES - found} near-duplicates"
+
+        # Fresh screenshots (usually no match)
+        fresh = [random.getrandbits(64) for _ in range(QUERIES)]
+        start = time.perf_counter()
+        for value in fresh:
+            index.find(value)
+        miss_us = (time.perf_counter() - start) / QUERIES * 1e6
+
+        print(f"{size:>10} {build:>9.2f} {hit_us:>9.1f} {miss_us:>9.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Statement reconciliation: 50k statement rows against waiting orders.
+
+Run: python benchmarks/bench_reconcile.py
+"""
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import database
+from reconcile import reconcile_statement
+from storage import SQLiteStorage
+
+STATEMENT_ROWS = 50_000
+WAITING_ORDERS = 5_000
+MISMATCHED = 200
+
+def build_orders():
+    for n in range(WAITING_ORDERS):
+        order_id = f"ORD{20260101000000 + n}{n % 10000:04d}"
+        database.add_product(f"data{n}", "Netflix", 50)
+        database.create_order(order_id, n, f"user{n}", n + 1, f"data{n}", 50 + n % 7)
+        database.update_order_screenshot(order_id, f"file{n}")
+
+def write_statement(path, orders):
+    random.seed(7)
+    rows = []
+    for i, order in enumerate(orders):
+        amount = order[5] + (1 if i < MISMATCHED else 0)
+        rows.append(['01/01/2026', f"UPI/{random.getrandbits(40)}/Order {order[0]} - {order[2]}", '', f"{amount}.00"])
+    while len(rows) < STATEMENT_ROWS:
+        rows.append(['01/01/2026', f"UPI/{random.getrandbits(40)}/Grocery store", f"{random.randint(10, 999)}.00", ''])
+    random.shuffle(rows)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Date', 'Narration', 'Debit', 'Credit'])
+        writer.writerows(rows)
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        database.set_storage(SQLiteStorage(os.path.join(tmp, 'bench.db')))
+        database.init_database()
+        build_orders()
+
+        path = os.path.join(tmp, 'statement.csv')
+        write_statement(path, database.get_pending_orders())
+
+        start = time.perf_counter()
+        pending = database.get_pending_orders()
+        index_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with open(path, newline='') as statement:
+            report = reconcile_statement(statement, pending)
+        match_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        approved = database.approve_orders([order_id for _, order_id, _ in report['matched']], 1)
+        approve_time = time.perf_counter() - start
+
+    print(f"{STATEMENT_ROWS} statement rows, {WAITING_ORDERS} waiting orders")
+    print(f"  load pending index : {index_time * 1000:8.1f} ms")
+    print(f"  parse + match      : {match_time * 1000:8.1f} ms ({STATEMENT_ROWS / match_time:,.0f} rows/s)")
+    print(f"  bulk approve       : {approve_time * 1000:8.1f} ms ({len(approved)} orders, 1 transaction)")
+    print(f"  matched={len(report['matched'])} mismatched={len(report['mismatched'])} "
+          f"unmatched={len(report['unmatched'])}")
+    assert len(approved) == WAITING_ORDERS - MISMATCHED
+    assert len(report['mismatched']) == MISMATCHED
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Storage engines: same checkout workload, throughput comparison.
+
+Har engine par same workload chalta hai, phir results compare hote hain
+(stats, user totals, active orders) - koi engine alag result de toh
+benchmark fail ho jata hai.
+
+Run: python benchmarks/bench_storage.py
+"""
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from storage import SQLiteStorage, MemoryStorage, ShardedSQLiteStorage
+
+USERS = 400
+ORDERS_PER_USER = 5
+THREADS = 8
+SHARDS = 4
+
+def user_flow(storage, user_id):
+    """Ek user ke saare orders: create -> lookup -> screenshot -> approve/reject"""
+    ops = 0
+    for n in range(ORDERS_PER_USER):
+        order_id = f"ORD{user_id:06d}{n:02d}"
+        product_id = user_id * ORDERS_PER_USER + n + 1
+        storage.create_order(order_id, user_id, f"user{user_id}", product_id, f"data{product_id}", 50 + n)
+        storage.get_active_order(user_id)
+        storage.update_order_screenshot(order_id, f"file{order_id}")
+        if n % 4 == 3:
+            storage.reject_order(order_id, 1)
+        elif n % 4 != 2:
+            storage.approve_order(order_id, 1)
+        ops += 4
+    return ops
+
+def run(name, storage):
+    storage.init_database()
+    for product_id in range(1, USERS * ORDERS_PER_USER + 1):
+        storage.add_product(f"data{product_id}", "Netflix", 50)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        ops = sum(pool.map(lambda uid: user_flow(storage, uid), range(USERS)))
+    elapsed = time.perf_counter() - start
+
+    print(f"{name:<22} {ops / elapsed:>10.0f} ops/s  ({ops} ops in {elapsed:.2f}s)")
+
+    users = sorted((u[0], u[4], u[5]) for rows in storage.iter_users(100) for u in rows)
+    active = [storage.get_active_order(uid)[0] for uid in range(USERS)]
+    pending = [o[0] for o in storage.get_pending_orders()]
+    return storage.get_stats(), users, active, sorted(pending)
+
+def main():
+    print(f"{USERS} users x {ORDERS_PER_USER} orders, {THREADS} threads")
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            'memory': run('memory', MemoryStorage()),
+            'sqlite': run('sqlite', SQLiteStorage(os.path.join(tmp, 'single.db'))),
+            'sharded': run(f'sharded sqlite ({SHARDS})', ShardedSQLiteStorage(
+                [os.path.join(tmp, f'shard_{i}.db') for i in range(SHARDS)])),
+        }
+
+    expected = results['sqlite']
+    for name, result in results.items():
+        assert result == expected, f"{name} engine disagrees with sqlite"
+    print("✅ all engines returned identical results")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Active order cache: har status transition ke baad cache == storage.
+
+Har engine par ek user ke orders saare transitions se guzarte hain (create,
+screenshot, approve, reject, expire, guarded failures, aur purana pending
+order dobara active hona). Har step ke baad:
+  * database.get_order_by_user() == storage.get_active_order()
+  * cache hit / miss metrics expected hain (write-through ke baad hit,
+    invalidate ke baad miss)
+
+Run: python benchmarks/check_active_order_cache.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import database
+import metrics
+from storage import SQLiteStorage, MemoryStorage, ShardedSQLiteStorage
+
+USER = 7
+OTHER_USER = 8
+
+class Checker:
+    def __init__(self, storage):
+        self.storage = storage
+        self.steps = 0
+
+    def check(self, step, expect, expected_order_id):
+        """Cache read karke storage se compare karta hai; expect = 'hit' ya 'miss'"""
+        hits = metrics.get('active_order_cache_hits')
+        misses = metrics.get('active_order_cache_misses')
+
+        cached = database.get_order_by_user(USER)
+        actual = self.storage.get_active_order(USER)
+
+        assert cached == actual, f"{step}: cache {cached} != storage {actual}"
+        assert (actual[0] if actual else None) == expected_order_id, \
+            f"{step}: active order {actual and actual[0]} != {expected_order_id}"
+        got = 'hit' if metrics.get('active_order_cache_hits') > hits else 'miss'
+        assert metrics.get('active_order_cache_misses') - misses == (got == 'miss'), f"{step}: metrics"
+        assert got == expect, f"{step}: expected cache {expect}, got {got}"
+
+        # Dusra read hamesha hit, wahi row
+        hits = metrics.get('active_order_cache_hits')
+        assert database.get_order_by_user(USER) == actual, f"{step}: second read differs"
+        assert metrics.get('active_order_cache_hits') == hits + 1, f"{step}: second read not a hit"
+        self.steps += 1
+
+def run(name, storage):
+    storage.init_database()
+    for n in range(1, 6):
+        storage.add_product(f"data{n}", "Netflix", 50)
+    database.set_storage(storage)
+    c = Checker(storage)
+
+    c.check("empty", 'miss', None)
+
+    database.create_order('O1', USER, 'u', 1, 'data1', 50)
+    c.check("create", 'hit', 'O1')
+
+    assert database.update_order_screenshot('O1', 'file1')
+    c.check("screenshot", 'hit', 'O1')
+
+    assert database.approve_order('O1', 1)
+    c.check("approve", 'miss', None)
+
+    # Guarded failures kuch nahi badalte, cache bhi nahi
+    assert not database.reject_order('O1', 1)
+    assert not database.update_order_screenshot('O1', 'again')
+    c.check("reject approved (refused)", 'hit', None)
+
+    database.create_order('O2', USER, 'u', 2, 'data2', 50)
+    c.check("create second", 'hit', 'O2')
+
+    # Dusre user ke writes is user ki entry nahi chhoote
+    database.create_order('X1', OTHER_USER, 'x', 5, 'data5', 50)
+    database.reject_order('X1', 1)
+    c.check("other user's writes", 'hit', 'O2')
+
+    time.sleep(1.1)     # order_date second resolution - O3 baad ka hona chahiye
+    database.create_order('O3', USER, 'u', 3, 'data3', 50)
+    c.check("create newer", 'hit', 'O3')
+
+    # Naya reject hua - purana pending O2 dobara active
+    assert database.reject_order('O3', 1)
+    c.check("older pending becomes active", 'miss', 'O2')
+
+    assert database.update_order_screenshot('O2', 'file2')
+    c.check("screenshot older", 'hit', 'O2')
+
+    assert database.reject_order('O2', 1)
+    c.check("reject waiting", 'miss', None)
+
+    time.sleep(1.1)
+    database.create_order('O4', USER, 'u', 4, 'data4', 50)
+    c.check("create before expiry", 'hit', 'O4')
+
+    time.sleep(1.1)
+    assert 'O4' in database.expire_stale_orders(0)
+    c.check("expire", 'miss', None)
+
+    assert not database.update_order_screenshot('O4', 'late')
+    assert not database.approve_order('O4', 1)
+    c.check("screenshot / approve expired (refused)", 'hit', None)
+
+    database.clear_active_order_cache()
+    c.check("cleared", 'miss', None)
+
+    print(f"{name:<10} ✅ {c.steps} steps consistent")
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        run('memory', MemoryStorage())
+        run('sqlite', SQLiteStorage(os.path.join(tmp, 'single.db')))
+        run('sharded', ShardedSQLiteStorage([os.path.join(tmp, f'shard_{i}.db') for i in range(4)]))
+    print("✅ active order cache consistent")
+
+if __name__ == '__main__':
+    main()
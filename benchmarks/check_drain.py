@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""Kill-under-load check for graceful drain, update journal aur outbox.
+
+Parent process ek fake Telegram Bot API server chalata hai (getUpdates offset
+semantics ke saath - confirm hua update dobara kabhi nahi aata). Child process
+asli bot.build_application() + bot.run_bot() chalata hai. Odd updates /ping
+hain - ek extra slow handler jo state DB mein likhta hai aur outbox se delivery
+bhejta hai. Even updates asli confirm_purchase button tap hain (sendPhoto slow
+hai, isliye handler order banane ke baad atakta hai). Server ek baar mein thode
+updates deta hai, isliye slow handler ke peeche updates queue mein jama hote
+hain (aur Telegram ko confirm ho chuke hote hain).
+
+Parent child ko beech mein kill karta hai (SIGTERM = graceful drain,
+SIGKILL = crash), phir final run sab khatam karta hai. Checks:
+  * SIGTERM: har update exactly once handle, har delivery exactly once
+  * SIGTERM, drain deadline se slow handler: cancel hua handler replay hota hai
+  * SIGKILL: kuch lost nahi (at-least-once)
+  * har scenario: har purchase ka exactly ek order (replay duplicate order nahi banata)
+
+Run: python benchmarks/check_drain.py [--updates N]
+"""
+import argparse
+import json
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+TOKEN = '123456:TEST'
+UPDATES_PER_FETCH = 5
+HANDLER_SECONDS = 0.02
+KILL_AFTER_HANDLED = 15
+FINAL_RUN_TIMEOUT_SECONDS = 60
+
+# ====================
+# FAKE BOT API
+# ====================
+class FakeTelegram:
+    """getUpdates / sendMessage ka minimal Bot API"""
+
+    def __init__(self, updates, photo_seconds=HANDLER_SECONDS):
+        self.lock = threading.Lock()
+        self.total = updates
+        self.photo_seconds = photo_seconds
+        self.confirmed = 1          # is id se chhote updates Telegram bhool chuka
+        self.sent = Counter()
+
+    def update(self, update_id):
+        user = {'id': update_id, 'is_bot': False, 'first_name': f'user{update_id}'}
+        message = {'message_id': update_id, 'date': int(time.time()),
+                   'chat': {'id': update_id, 'type': 'private'}, 'from': user}
+        if is_purchase(update_id):
+            return {
+                'update_id': update_id,
+                'callback_query': {'id': str(update_id), 'from': user, 'chat_instance': str(update_id),
+                                   'data': 'confirm_purchase', 'message': {**message, 'text': 'Order Summary'}},
+            }
+        return {
+            'update_id': update_id,
+            'message': {**message, 'text': '/ping',
+                        'entities': [{'type': 'bot_command', 'offset': 0, 'length': 5}]},
+        }
+
+    def call(self, method, params):
+        if method == 'getMe':
+            return {'id': 1, 'is_bot': True, 'first_name': 'Test', 'username': 'test_bot'}
+        if method == 'getUpdates':
+            offset = int(params.get('offset') or 0)
+            with self.lock:
+                self.confirmed = max(self.confirmed, offset)
+                ids = list(range(self.confirmed, min(self.confirmed + UPDATES_PER_FETCH, self.total + 1)))
+            if not ids:
+                time.sleep(min(float(params.get('timeout') or 0), 0.5))
+            return [self.update(i) for i in ids]
+        if method == 'sendPhoto':
+            time.sleep(self.photo_seconds)      # QR upload slow - handler order ke baad atakta hai
+            return {'message_id': 1, 'date': int(time.time()), 'chat': {'id': 1, 'type': 'private'},
+                    'photo': [{'file_id': 'qr', 'file_unique_id': 'qr', 'width': 1, 'height': 1}]}
+        if method == 'sendMessage':
+            with self.lock:
+                self.sent[params['text']] += 1
+                message_id = sum(self.sent.values())
+            return {'message_id': message_id, 'date': int(time.time()),
+                    'chat': {'id': int(params['chat_id']), 'type': 'private'}, 'text': params['text']}
+        return True
+
+def serve(fake):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            # sendPhoto multipart (PNG) hai - uske params ki zaroorat nahi
+            multipart = 'multipart' in self.headers.get('Content-Type', '')
+            params = {} if multipart else {k: v[0] for k, v in parse_qs(body.decode(), keep_blank_values=True).items()}
+            result = fake.call(self.path.rsplit('/', 1)[-1], params)
+            payload = json.dumps({'ok': True, 'result': result}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            try:
+                self.end_headers()
+                self.wfile.write(payload)
+            except (BrokenPipeError, ConnectionResetError):
+                pass    # client ne long poll cancel kiya (updater stop / kill)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# ====================
+# CHILD (real bot)
+# ====================
+def is_purchase(update_id):
+    return update_id % 2 == 0
+
+def _state(path):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute('CREATE TABLE IF NOT EXISTS handled (update_id INTEGER PRIMARY KEY, count INTEGER)')
+    return conn
+
+def handled_counts(state_path):
+    conn = _state(state_path)
+    rows = dict(conn.execute('SELECT update_id, count FROM handled').fetchall())
+    conn.close()
+    return rows
+
+def order_counts(db_path):
+    """user_id -> orders count (har purchase user alag hai)"""
+    if not os.path.exists(db_path):
+        return {}
+    conn = sqlite3.connect(db_path, timeout=30)
+    rows = dict(conn.execute('SELECT user_id, COUNT(*) FROM orders GROUP BY user_id').fetchall())
+    conn.close()
+    return rows
+
+def run_child(tmp, base_url, handler_seconds, drain_deadline):
+    import asyncio
+    import config
+    config.BOT_TOKEN = TOKEN
+    config.BOT_API_BASE_URL = base_url
+    config.STORAGE_ENGINE = 'sqlite'
+    config.DATABASE_PATH = os.path.join(tmp, 'bot.db')
+    config.RUNTIME_DB_PATH = os.path.join(tmp, 'runtime.db')
+    config.QR_PREWARM = False
+    if drain_deadline is not None:
+        config.DRAIN_DEADLINE_SECONDS = drain_deadline
+
+    import bot
+    import outbox
+    from telegram import Update
+    from telegram.ext import CommandHandler, TypeHandler
+    from journal import JournalingUpdateProcessor
+
+    outbox.OUTBOX_BATCH_INTERVAL_SECONDS = 0.1
+    state_path = os.path.join(tmp, 'state.db')
+
+    async def ping(update, context):
+        conn = _state(state_path)
+        conn.execute('INSERT INTO handled (update_id, count) VALUES (?, 1) '
+                     'ON CONFLICT(update_id) DO UPDATE SET count = count + 1', (update.update_id,))
+        conn.commit()
+        conn.close()
+        await asyncio.sleep(handler_seconds)
+        outbox.enqueue_message(update.effective_chat.id, f"delivery {update.update_id}")
+
+    async def selected_product(update, context):
+        # select_product ka kaam - user_data persist nahi hota, replay par bhi product chahiye
+        if update.callback_query:
+            context.user_data.update(selected_product_id=1, selected_product_data='data1',
+                                     selected_price=50, selected_category='Netflix')
+
+    bot.prepare_storage()
+    if not bot.get_product_by_id(1):
+        bot.add_product('data1', 'Netflix', 50)
+    processor = JournalingUpdateProcessor()
+    application = bot.build_application(processor)
+    application.add_handler(CommandHandler('ping', ping))
+    application.add_handler(TypeHandler(Update, selected_product), group=-2)
+    asyncio.run(bot.run_bot(application, processor))
+
+# ====================
+# PARENT
+# ====================
+def spawn(tmp, base_url, updates, log, child_args=()):
+    env = dict(os.environ, NO_PROXY='127.0.0.1,localhost')
+    for key in ('HTTP_PROXY', 'HTTPS_PROXY', 'ALL_PROXY', 'http_proxy', 'https_proxy', 'all_proxy'):
+        env.pop(key, None)
+    return subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--child', tmp, base_url, '--updates', str(updates),
+         *child_args],
+        env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+def wait_for(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+def scenario(name, kill_signal, rounds, updates, child_args=(), exactly_once=False, handler_seconds=HANDLER_SECONDS):
+    fake = FakeTelegram(updates, handler_seconds)
+    server = serve(fake)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/bot"
+    pings = {i for i in range(1, updates + 1) if not is_purchase(i)}
+    purchases = {i for i in range(1, updates + 1) if is_purchase(i)}
+    expected_sent = {f"delivery {i}" for i in pings}
+    child_args = ('--handler-seconds', str(handler_seconds), *child_args)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        state_path = os.path.join(tmp, 'state.db')
+        log_path = os.path.join(tmp, 'child.log')
+        started = time.perf_counter()
+
+        def fail(message):
+            with open(log_path) as f:
+                print(''.join(f.readlines()[-30:]))
+            raise AssertionError(message)
+
+        db_path = os.path.join(tmp, 'bot.db')
+        with open(log_path, 'a') as log:
+            for round_no in range(rounds):
+                # Kill kabhi /ping ke beech, kabhi order banne ke turant baad (QR upload ke beech)
+                if round_no % 2:
+                    progress = lambda: sum(order_counts(db_path).values())
+                else:
+                    progress = lambda: sum(handled_counts(state_path).values())
+                before = progress()
+                child = spawn(tmp, base_url, updates, log, child_args)
+                wait_for(lambda: progress() >= before + KILL_AFTER_HANDLED, 30)
+                child.send_signal(kill_signal)
+                code = child.wait()
+                if kill_signal == signal.SIGTERM and code != 0:
+                    fail(f"graceful drain exited with {code}")
+
+            child = spawn(tmp, base_url, updates, log)
+            wait_for(lambda: expected_sent <= set(fake.sent) and purchases <= set(order_counts(db_path)),
+                     FINAL_RUN_TIMEOUT_SECONDS)
+            child.send_signal(signal.SIGTERM)
+            if child.wait() != 0:
+                fail("final run did not exit cleanly")
+
+        handled = handled_counts(state_path)
+        orders = order_counts(db_path)
+        missing_handled = pings - set(handled)
+        missing_sent = expected_sent - set(fake.sent)
+        missing_orders = purchases - set(orders)
+        dup_handled = sum(1 for c in handled.values() if c > 1)
+        dup_sent = sum(1 for c in fake.sent.values() if c > 1)
+        dup_orders = sorted(user_id for user_id, c in orders.items() if c > 1)
+
+        print(f"{name}: {rounds} kills + final run in {time.perf_counter() - started:.1f}s")
+        print(f"  handled {len(handled)}/{len(pings)} (dups {dup_handled}), "
+              f"sent {len(expected_sent & set(fake.sent))}/{len(pings)} (dups {dup_sent}), "
+              f"orders {len(orders)}/{len(purchases)} (dups {len(dup_orders)})")
+        server.shutdown()
+
+        assert not missing_handled, f"lost updates: {sorted(missing_handled)[:10]}"
+        assert not missing_sent, f"lost messages: {sorted(missing_sent)[:10]}"
+        assert not missing_orders, f"lost purchases: {sorted(missing_orders)[:10]}"
+        assert not dup_orders, f"replayed purchase created a second order for users {dup_orders[:10]}"
+        if exactly_once:
+            assert not dup_handled and not dup_sent, "duplicate processing after graceful drain"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--updates', type=int, default=150)
+    parser.add_argument('--child', nargs=2, metavar=('TMP_DIR', 'BASE_URL'))
+    parser.add_argument('--handler-seconds', type=float, default=HANDLER_SECONDS)
+    parser.add_argument('--drain-deadline', type=float)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child, args.handler_seconds, args.drain_deadline)
+        return
+
+    scenario("SIGTERM (graceful drain)", signal.SIGTERM, rounds=3, updates=args.updates, exactly_once=True)
+    # Handler deadline se lamba - drain use cancel karta hai, journal mein 'received' rehna chahiye
+    scenario("SIGTERM (drain deadline exceeded)", signal.SIGTERM, rounds=3, updates=args.updates,
+             child_args=('--drain-deadline', '0.1'), handler_seconds=0.3)
+    scenario("SIGKILL (crash)", signal.SIGKILL, rounds=3, updates=args.updates)
+    print("✅ drain check OK")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Import-time regression check for bot.py.
+
+Fresh interpreter mein `import bot` ka time budget ke andar hona chahiye,
+aur heavy optional deps (qrcode, Pillow) startup par import nahi hone chahiye.
+Budget se zyada ho toh exit code 1.
+
+Run: python benchmarks/check_import_time.py
+"""
+import os
+import subprocess
+import sys
+
+IMPORT_BUDGET_SECONDS = 0.6
+RUNS = 3
+LAZY_MODULES = ('qrcode', 'PIL', 'concurrent.futures.process')
+
+PROBE = f"""
+import sys, time
+started = time.perf_counter()
+import bot
+elapsed = time.perf_counter() - started
+loaded = [m for m in {LAZY_MODULES!r} if m in sys.modules]
+print(elapsed, ','.join(loaded))
+"""
+
+def main():
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    timings = []
+    for _ in range(RUNS):
+        out = subprocess.run([sys.executable, '-c', PROBE], cwd=root, check=True,
+                             capture_output=True, text=True).stdout.split()
+        timings.append(float(out[0]))
+        eager = out[1] if len(out) > 1 else ''
+
+    best = min(timings)
+    print(f"import bot: best {best * 1000:.0f}ms of {RUNS} (budget {IMPORT_BUDGET_SECONDS * 1000:.0f}ms)")
+
+    failed = False
+    if best > IMPORT_BUDGET_SECONDS:
+        print("❌ import time over budget")
+        failed = True
+    if eager:
+        print(f"❌ heavy modules imported at startup: {eager}")
+        failed = True
+    if not failed:
+        print("✅ import time OK")
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
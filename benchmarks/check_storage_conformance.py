@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""Storage conformance suite - har check har engine par.
+
+Har check ek fresh storage par chalta hai (memory, sqlite, sharded sqlite) aur
+Storage interface ka behaviour expected values se compare karta hai -
+guarded transition failures, ordering, pagination aur edge cases samet.
+End mein verify hota hai ki Storage ka har public method kam se kam ek
+check ne chalaya.
+
+Run: python benchmarks/check_storage_conformance.py [-k name]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import traceback
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from storage import Storage, SQLiteStorage, MemoryStorage, ShardedSQLiteStorage
+
+SHARDS = 3
+
+ENGINES = {
+    'memory': lambda tmp: MemoryStorage(),
+    'sqlite': lambda tmp: SQLiteStorage(os.path.join(tmp, 'single.db')),
+    'sharded': lambda tmp: ShardedSQLiteStorage([os.path.join(tmp, f'shard_{i}.db') for i in range(SHARDS)]),
+}
+
+class Recorder:
+    """Storage ke calls record karta hai - coverage check ke liye"""
+
+    def __init__(self, storage, called):
+        self._storage = storage
+        self._called = called
+
+    def __getattr__(self, name):
+        attr = getattr(self._storage, name)
+        if callable(attr):
+            self._called.add(name)
+        return attr
+
+def fields(row, *idx):
+    return tuple(row[i] for i in idx) if row else None
+
+def order_ids(rows):
+    return [row[0] for row in rows]
+
+def add_products(s, count, category="Netflix", price=50):
+    return [s.add_product(f"{category}-{n}", category, price + n) for n in range(count)]
+
+def waiting_order(s, order_id, user_id, product_id, amount=50):
+    s.create_order(order_id, user_id, f"user{user_id}", product_id, f"data{product_id}", amount)
+    return s.update_order_screenshot(order_id, f"file-{order_id}")
+
+# ====================
+# CHECKS
+# ====================
+def check_init_idempotent(s):
+    assert s.init_database() is False, "second init should report schema up to date"
+
+def check_products(s):
+    first, second = add_products(s, 2)
+    assert first is not None and second is not None and first != second
+    assert s.add_product("Netflix-0", "Netflix", 99) is None, "duplicate product_data must be refused"
+
+    assert fields(s.get_product_by_id(first), 0, 1, 2, 3, 4) == (first, "Netflix-0", "Netflix", 50, 0)
+    assert s.get_product_by_id(99999) is None
+
+    assert s.get_available_products() == [(first, "Netflix-0", "Netflix", 50), (second, "Netflix-1", "Netflix", 51)]
+
+    assert s.mark_product_sold(first) is True
+    assert s.mark_product_sold(first) is False, "already sold"
+    assert s.mark_product_sold(99999) is False, "missing product"
+    assert s.get_product_by_id(first)[4] == 1
+    assert order_ids(s.get_available_products()) == [second]
+
+def check_categories(s):
+    assert s.get_categories() == []
+    spotify = add_products(s, 1, "Spotify")[0]
+    add_products(s, 2, "Amazon")
+    s.mark_product_sold(spotify)
+    assert s.get_categories() == ["Amazon", "Spotify"], "sorted, sold-out categories included"
+
+def check_order_lifecycle(s):
+    product = add_products(s, 1)[0]
+    order = s.create_order("O1", 10, "alice", product, "Netflix-0", 50)
+    assert fields(order, 0, 1, 2, 3, 5, 6, 7) == ("O1", 10, "alice", product, 50, None, "pending")
+    assert s.get_order_by_id("O1") == order
+    assert s.get_order_by_id("missing") is None
+    assert s.get_active_order(10) == order
+    assert s.get_active_order(11) is None
+
+    waiting = s.update_order_screenshot("O1", "file1")
+    assert fields(waiting, 6, 7) == ("file1", "waiting_approval")
+    assert order_ids(s.get_pending_orders()) == ["O1"]
+    assert s.get_active_order(10) == waiting
+
+    approved = s.approve_order("O1", 1)
+    assert fields(approved, 7, 10) == ("approved", 1)
+    assert s.get_product_by_id(product)[4] == 1
+    assert s.get_active_order(10) is None
+    assert s.get_pending_orders() == []
+
+    user = [u for rows in s.iter_users(10) for u in rows if u[0] == 10][0]
+    assert (user[4], user[5]) == (1, 50)
+
+    stats = s.get_stats()
+    assert (stats['total_products'], stats['available_products'], stats['sold_products']) == (1, 0, 1)
+    assert (stats['total_orders'], stats['approved_orders'], stats['pending_orders']) == (1, 1, 0)
+    assert stats['total_revenue'] == 50
+    assert stats['total_users'] == 1
+
+def check_guarded_transitions(s):
+    product = add_products(s, 1)[0]
+    s.create_order("P1", 10, "a", product, "d", 50)
+    assert s.approve_order("P1", 1) is None, "pending (no screenshot) cannot be approved"
+    assert s.approve_order("missing", 1) is None
+    assert s.update_order_screenshot("missing", "f") is None
+
+    rejected = s.reject_order("P1", 1)
+    assert rejected[7] == "rejected", "pending can be rejected"
+    assert s.reject_order("P1", 1) is None, "already rejected"
+    assert s.update_order_screenshot("P1", "late") is None, "no screenshot on rejected order"
+    assert s.get_order_by_id("P1")[6] is None
+
+    waiting_order(s, "W1", 11, product)
+    assert s.update_order_screenshot("W1", "again") is None, "screenshot only once"
+    assert s.approve_order("W1", 1)[7] == "approved"
+    assert s.reject_order("W1", 1) is None, "approved order can never be rejected"
+    assert s.approve_order("W1", 1) is None, "no double approve"
+    assert s.get_order_by_id("W1")[7] == "approved"
+
+    user = [u for rows in s.iter_users(10) for u in rows if u[0] == 11][0]
+    assert (user[4], user[5]) == (1, 50), "totals counted once"
+
+def check_no_double_sell(s):
+    product = add_products(s, 1)[0]
+    waiting_order(s, "A", 10, product)
+    waiting_order(s, "B", 11, product)      # alag shard (sharded engine)
+    assert s.approve_order("A", 1)[7] == "approved"
+    assert s.approve_order("B", 1) is None, "product already sold"
+    assert s.get_order_by_id("B")[7] == "waiting_approval", "refused approve changes nothing"
+    assert s.get_product_by_id(product)[4] == 1
+    assert s.get_stats()['approved_orders'] == 1
+
+def check_approve_orders_batch(s):
+    p1, p2, p3 = add_products(s, 3)
+    waiting_order(s, "A", 10, p1)
+    waiting_order(s, "B", 11, p1)           # same product as A
+    waiting_order(s, "C", 12, p2)
+    s.create_order("D", 13, "d", p3, "d", 50)   # pending, not approvable
+    approved = s.approve_orders(["A", "B", "C", "D", "missing"], 1)
+    assert sorted(order_ids(approved)) == ["A", "C"]
+    assert all(o[7] == "approved" for o in approved)
+    assert s.get_order_by_id("B")[7] == "waiting_approval"
+    assert s.get_order_by_id("D")[7] == "pending"
+    assert s.get_product_by_id(p3)[4] == 0
+    assert s.approve_orders([], 1) == []
+
+def check_expire(s):
+    p1, p2 = add_products(s, 2)
+    s.create_order("OLD", 10, "a", p1, "d", 50)
+    waiting_order(s, "WAIT", 11, p2)
+    time.sleep(1.1)
+    s.create_order("NEW", 12, "c", p1, "d", 50)
+    assert s.expire_stale_orders(60) == [], "nothing older than an hour"
+
+    expired = s.expire_stale_orders(0)
+    assert ("OLD", 10) in expired and all(oid != "WAIT" for oid, _ in expired)
+    assert s.get_order_by_id("OLD")[7] == "expired"
+    assert s.get_order_by_id("WAIT")[7] == "waiting_approval"
+    assert s.update_order_screenshot("OLD", "late") is None
+    assert s.reject_order("OLD", 1) is None
+    assert s.get_active_order(10) is None
+
+    # Injected clock: order_date aur cutoff dono logical time se
+    s.create_order("T1", 13, "d", p2, "d", 50, order_date="2024-01-01 00:00:00")
+    s.create_order("T2", 14, "e", p2, "d", 50, order_date="2024-01-01 00:05:00")
+    assert s.get_order_by_id("T1")[8] == "2024-01-01 00:00:00"
+    assert s.expire_stale_orders(5, now="2024-01-01 00:05:00") == [], "T1 not older than 5 min"
+    assert s.expire_stale_orders(5, now="2024-01-01 00:05:01") == [("T1", 13)]
+    assert s.get_order_by_id("T2")[7] == "pending"
+
+def check_user_orders_ordering(s):
+    product = add_products(s, 1)[0]
+    s.create_order("U1", 10, "a", product, "d", 50)
+    s.create_order("U2", 10, "a", product, "d", 50)     # same second - insert order tiebreak
+    time.sleep(1.1)
+    s.create_order("U3", 10, "a", product, "d", 50)
+    s.create_order("X1", 11, "b", product, "d", 50)
+    assert order_ids(s.get_user_orders(10)) == ["U3", "U2", "U1"]
+    assert order_ids(s.get_user_orders(10, limit=2)) == ["U3", "U2"]
+    assert s.get_user_orders(99) == []
+    assert s.get_active_order(10)[0] == "U3"
+    s.reject_order("U3", 1)
+    assert s.get_active_order(10)[0] == "U2", "older pending order becomes active"
+
+def check_users(s):
+    p1, p2, p3 = add_products(s, 3)
+    waiting_order(s, "A", 10, p1, amount=30)
+    time.sleep(1.1)
+    waiting_order(s, "B", 11, p2, amount=80)
+    s.create_order("B2", 11, "renamed", p3, "d", 10)    # existing user - no new row
+    time.sleep(1.1)
+    s.create_order("C", 12, "c", p3, "d", 10)
+    s.approve_order("A", 1)
+    s.approve_order("B", 1)
+
+    assert s.get_user_count() == 3
+    assert [u[0] for u in s.get_all_users()] == [12, 11, 10], "newest join first"
+    assert [u[0] for u in s.get_recent_users(2)] == [12, 11]
+    assert [(u[0], u[5]) for u in s.get_top_users(2)] == [(11, 80), (10, 30)]
+    assert [u[1] for u in s.get_all_users() if u[0] == 11] == ["user11"], "username from first order"
+
+    chunks = list(s.iter_users(2))
+    assert [[u[0] for u in chunk] for chunk in chunks] == [[10, 11], [12]]
+
+def check_screenshot_hashes(s):
+    assert [h for rows in s.iter_screenshot_hashes() for h in rows] == []
+    big = (1 << 64) - 1
+    s.add_screenshot_hash("O1", 10, big)
+    s.add_screenshot_hash("O2", 11, 0)
+    s.add_screenshot_hash("O3", 12, 0x1234ABCD)
+    chunks = list(s.iter_screenshot_hashes(2))
+    assert [len(c) for c in chunks] == [2, 1]
+    assert [h for c in chunks for h in c] == [("O1", 10, big), ("O2", 11, 0), ("O3", 12, 0x1234ABCD)]
+
+def check_restock(s):
+    assert s.add_restock_subscription(30, "Netflix") is True
+    assert s.add_restock_subscription(30, "Netflix") is False, "duplicate"
+    for user_id in (10, 20, 40):
+        s.add_restock_subscription(user_id, "Netflix")
+    s.add_restock_subscription(10, "Spotify")
+
+    assert s.get_restock_subscribers("Netflix") == [10, 20, 30, 40]
+    assert s.get_restock_subscribers("Netflix", 0, 2) == [10, 20]
+    assert s.get_restock_subscribers("Netflix", 20, 2) == [30, 40]
+    assert s.get_restock_subscribers("Netflix", 40) == []
+    assert s.get_restock_subscribers("Amazon") == []
+
+    s.remove_restock_subscriptions("Netflix", [10, 30])
+    s.remove_restock_subscriptions("Netflix", [])
+    assert s.get_restock_subscribers("Netflix") == [20, 40]
+    assert s.get_restock_subscribers("Spotify") == [10], "other category untouched"
+
+def check_review_queue(s):
+    p1, p2, p3 = add_products(s, 3)
+    assert s.get_review_queue()['waiting'] == 0
+    assert s.claim_next_order(1, 60) is None
+
+    waiting_order(s, "R1", 10, p1)
+    time.sleep(1.1)
+    waiting_order(s, "R2", 11, p2)
+    s.create_order("R3", 12, "c", p3, "d", 50)      # pending - not in queue
+    queue = s.get_review_queue()
+    assert queue['waiting'] == 2 and queue['oldest_wait_seconds'] >= 1
+
+    assert s.claim_next_order(1, 60)[0] == "R1", "oldest first"
+    assert s.claim_next_order(2, 60)[0] == "R2", "claimed order skipped"
+    assert s.claim_next_order(3, 60) is None
+    assert s.claim_order("R1", 2, 60) is False, "leased to reviewer 1"
+    assert s.claim_order("R1", 1, 60) is True, "renew own lease"
+    assert s.claim_order("R3", 1, 60) is False, "not in queue"
+
+    # Apna lease /next se dobara mile toh claimed_date nahi badalta
+    time.sleep(2.1)
+    assert s.claim_next_order(1, 60)[0] == "R1", "own lease first"
+    assert s.approve_order("R1", 1)
+    wait = {row[0]: row[2] for row in s.get_reviewer_stats()}[1]
+    assert wait < 3, f"claimed_date reset on re-serve (wait {wait:.1f}s)"
+    assert s.claim_order("R1", 1, 60) is False, "completed review"
+    assert s.get_review_queue()['waiting'] == 1
+
+    # Expired lease dusra reviewer le sakta hai
+    assert s.claim_order("R2", 2, 0) is True
+    time.sleep(1.1)
+    assert s.claim_order("R2", 3, 60) is True
+    assert s.reject_order("R2", 3)
+
+    stats = {row[0]: row[1] for row in s.get_reviewer_stats()}
+    assert stats == {1: 1, 3: 1}
+    assert s.get_review_queue() == {'waiting': 0, 'oldest_wait_seconds': 0}
+
+CHECKS = [
+    check_init_idempotent,
+    check_products,
+    check_categories,
+    check_order_lifecycle,
+    check_guarded_transitions,
+    check_no_double_sell,
+    check_approve_orders_batch,
+    check_expire,
+    check_user_orders_ordering,
+    check_users,
+    check_screenshot_hashes,
+    check_restock,
+    check_review_queue,
+]
+
+def interface_methods():
+    return {name for name, value in vars(Storage).items() if callable(value) and not name.startswith('_')}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-k', help='sirf naam mein yeh text wale checks')
+    args = parser.parse_args()
+
+    checks = [c for c in CHECKS if not args.k or args.k in c.__name__]
+    called = set()
+    failures = 0
+
+    for check in checks:
+        results = []
+        for engine, factory in ENGINES.items():
+            with tempfile.TemporaryDirectory() as tmp:
+                storage = factory(tmp)
+                storage.init_database()
+                try:
+                    check(Recorder(storage, called))
+                    results.append(f"{engine} ✅")
+                except Exception:
+                    failures += 1
+                    results.append(f"{engine} ❌")
+                    print(f"--- {check.__name__} [{engine}]")
+                    traceback.print_exc()
+        print(f"{check.__name__:<30} {'  '.join(results)}")
+
+    if not args.k:
+        missing = interface_methods() - called
+        assert not missing, f"Storage methods not covered: {sorted(missing)}"
+
+    if failures:
+        print(f"❌ {failures} failures")
+        sys.exit(1)
+    print(f"✅ {len(checks)} checks x {len(ENGINES)} engines passed")
+
+if __name__ == '__main__':
+    main()
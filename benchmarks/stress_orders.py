@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""Order state machine: concurrent stress + invariant check.
+
+Buyers, screenshots, approvals, rejections aur expiries random interleaving
+mein real database.py (cache + storage engine) par threads se chalte hain.
+Har worker ka random stream seed se fix hai aur order_date / expiry cutoff
+wall clock nahi, logical clock (har op = ek second) se aate hain; --serial ke
+saath workers round-robin ek ek op chalate hain, isliye failing seed poora
+replay hota hai.
+
+End par invariants check hote hain:
+  * koi product do baar nahi bika (har product ka max ek approved order)
+  * har approved order ka product sold hai, aur har sold product ka approved order hai
+  * users ka total_orders / total_spent == approved orders ka count / sum
+  * har order ke successful transitions ek valid path hain
+    (approved order kabhi reject nahi, screenshot sirf pending par)
+  * active order cache storage se match karta hai
+
+Report: transitions/sec aur contention delay (concurrent latency - serial mean).
+
+Run: python benchmarks/stress_orders.py [--seed 7] [--engine sqlite] [--workers 8] [--ops 400] [--serial]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import database
+from storage import SQLiteStorage, MemoryStorage, ShardedSQLiteStorage
+
+USERS = 60
+PRODUCTS = 40          # users se kam - same product par kai buyers (contention)
+SHARDS = 4
+EXPIRE_AFTER_MINUTES = 1   # logical clock par 60 ops
+CLOCK_START = datetime(2024, 1, 1)
+
+# (operation, weight)
+OPERATIONS = [
+    ('buy', 35),
+    ('screenshot', 25),
+    ('approve', 15),
+    ('reject', 8),
+    ('approve_any', 7),   # kisi bhi order ko approve - double sell / galat state try
+    ('reject_any', 7),    # approved order reject karne ki koshish bhi
+    ('expire', 3),
+]
+WRITE_OPERATIONS = {'buy', 'screenshot', 'approve', 'reject', 'approve_any', 'reject_any', 'expire'}
+
+# Har order ke successful transitions ke valid sets
+VALID_PATHS = [
+    set(),
+    {'waiting_approval'},
+    {'waiting_approval', 'approved'},
+    {'waiting_approval', 'rejected'},
+    {'rejected'},
+    {'expired'},
+]
+
+def make_storage(engine, tmp):
+    if engine == 'memory':
+        return MemoryStorage()
+    if engine == 'sharded':
+        return ShardedSQLiteStorage([os.path.join(tmp, f'shard_{i}.db') for i in range(SHARDS)])
+    return SQLiteStorage(os.path.join(tmp, 'stress.db'))
+
+class Run:
+    """Ek stress run ka shared state: known orders, transition log, latencies"""
+
+    def __init__(self, seed, workers):
+        self.rngs = [random.Random(seed * 1000 + w) for w in range(workers)]
+        self.seq = [0] * workers
+        self.ticks = 0                   # logical clock - har op ek second
+        self.now = [None] * workers
+        self.orders = []
+        self.transitions = []            # (order_id, new_status)
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.lock = threading.Lock()
+
+    def step(self, worker):
+        rng = self.rngs[worker]
+        op = rng.choices([o for o, _ in OPERATIONS], [w for _, w in OPERATIONS])[0]
+        with self.lock:
+            self.ticks += 1
+            self.now[worker] = (CLOCK_START + timedelta(seconds=self.ticks)).strftime('%Y-%m-%d %H:%M:%S')
+        started = time.perf_counter()
+        try:
+            getattr(self, f'op_{op}')(worker, rng)
+        except sqlite3.OperationalError as e:
+            self.errors[f'{op}: {e}'] += 1
+        self.latencies[op].append(time.perf_counter() - started)
+
+    def record(self, order_id, status):
+        with self.lock:
+            self.transitions.append((order_id, status))
+
+    def pick_order(self, rng):
+        with self.lock:
+            return rng.choice(self.orders) if self.orders else None
+
+    def op_buy(self, worker, rng):
+        user_id = rng.randrange(1, USERS + 1)
+        product = database.get_product_by_id(rng.randrange(1, PRODUCTS + 1))
+        if product is None or product[4]:
+            return
+        self.seq[worker] += 1
+        order_id = f"ORD{worker:02d}{self.seq[worker]:06d}"
+        database.create_order(order_id, user_id, f"user{user_id}", product[0], product[1], product[3],
+                              order_date=self.now[worker])
+        with self.lock:
+            self.orders.append(order_id)
+
+    def op_screenshot(self, worker, rng):
+        order = database.get_order_by_user(rng.randrange(1, USERS + 1))
+        if order and order[7] == 'pending':
+            if database.update_order_screenshot(order[0], f"file{order[0]}"):
+                self.record(order[0], 'waiting_approval')
+
+    def _review(self, rng, action):
+        waiting = database.get_pending_orders()
+        if waiting:
+            self._apply(rng.choice(waiting)[0], action)
+
+    def _apply(self, order_id, action):
+        if action == 'approve':
+            if database.approve_order(order_id, 1):
+                self.record(order_id, 'approved')
+        elif database.reject_order(order_id, 1):
+            self.record(order_id, 'rejected')
+
+    def op_approve(self, worker, rng):
+        self._review(rng, 'approve')
+
+    def op_reject(self, worker, rng):
+        self._review(rng, 'reject')
+
+    def op_approve_any(self, worker, rng):
+        order_id = self.pick_order(rng)
+        if order_id:
+            self._apply(order_id, 'approve')
+
+    def op_reject_any(self, worker, rng):
+        order_id = self.pick_order(rng)
+        if order_id:
+            self._apply(order_id, 'reject')
+
+    def op_expire(self, worker, rng):
+        for order_id in database.expire_stale_orders(EXPIRE_AFTER_MINUTES, now=self.now[worker]):
+            self.record(order_id, 'expired')
+
+def drive(run, workers, ops, serial):
+    started = time.perf_counter()
+    if serial:
+        for _ in range(ops):
+            for worker in range(workers):
+                run.step(worker)
+    else:
+        barrier = threading.Barrier(workers)
+
+        def worker_loop(worker):
+            barrier.wait()
+            for _ in range(ops):
+                run.step(worker)
+
+        threads = [threading.Thread(target=worker_loop, args=(w,)) for w in range(workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    return time.perf_counter() - started
+
+def dump(storage):
+    """(orders, products, users) - saare engines se ek format mein"""
+    if isinstance(storage, MemoryStorage):
+        orders = {o[0]: (o[1], o[3], o[5], o[7]) for o in storage._orders.values()}
+        products = {p[0]: p[4] for p in storage._products.values()}
+        users = {u[0]: (u[4], u[5]) for u in storage._users.values()}
+        return orders, products, users
+
+    shards = storage.shards if isinstance(storage, ShardedSQLiteStorage) else [storage]
+    orders, users = {}, {}
+    for shard in shards:
+        conn = sqlite3.connect(shard.path)
+        for order_id, user_id, product_id, amount, status in conn.execute(
+                'SELECT order_id, user_id, product_id, amount, status FROM orders'):
+            orders[order_id] = (user_id, product_id, amount, status)
+        for user_id, total_orders, total_spent in conn.execute(
+                'SELECT user_id, total_orders, total_spent FROM users'):
+            users[user_id] = (total_orders, total_spent)
+        conn.close()
+    conn = sqlite3.connect(shards[0].path)
+    products = dict(conn.execute('SELECT id, sold FROM products'))
+    conn.close()
+    return orders, products, users
+
+def check_invariants(run, storage):
+    orders, products, users = dump(storage)
+    failures = []
+
+    approved_by_product = defaultdict(list)
+    totals = defaultdict(lambda: [0, 0])
+    for order_id, (user_id, product_id, amount, status) in orders.items():
+        if status == 'approved':
+            approved_by_product[product_id].append(order_id)
+            totals[user_id][0] += 1
+            totals[user_id][1] += amount
+
+    for product_id, order_ids in approved_by_product.items():
+        if len(order_ids) > 1:
+            failures.append(f"product {product_id} sold twice: {order_ids}")
+        if not products.get(product_id):
+            failures.append(f"product {product_id} approved in {order_ids} but not marked sold")
+    for product_id, sold in products.items():
+        if sold and product_id not in approved_by_product:
+            failures.append(f"product {product_id} sold without an approved order")
+
+    for user_id, (total_orders, total_spent) in users.items():
+        expected = totals.get(user_id, [0, 0])
+        if [total_orders, total_spent] != expected:
+            failures.append(f"user {user_id} totals {total_orders}/{total_spent} != approved {expected}")
+
+    history = defaultdict(list)
+    for order_id, status in run.transitions:
+        history[order_id].append(status)
+    for order_id, (_, _, _, status) in orders.items():
+        steps = history.get(order_id, [])
+        if len(steps) != len(set(steps)) or set(steps) not in VALID_PATHS:
+            failures.append(f"order {order_id} invalid transitions {steps}")
+            continue
+        final = next((s for s in ('approved', 'rejected', 'expired', 'waiting_approval') if s in steps), 'pending')
+        if final != status:
+            failures.append(f"order {order_id} is {status} but transitions say {final}")
+
+    for user_id in range(1, USERS + 1):
+        if database.get_order_by_user(user_id) != storage.get_active_order(user_id):
+            failures.append(f"active order cache stale for user {user_id}")
+
+    return orders, products, failures
+
+def stress(engine, seed, workers, ops, serial):
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = make_storage(engine, tmp)
+        storage.init_database()
+        for product_id in range(1, PRODUCTS + 1):
+            storage.add_product(f"data{product_id}", "Netflix", 50 + product_id % 7)
+        database.set_storage(storage)
+
+        run = Run(seed, workers)
+        elapsed = drive(run, workers, ops, serial)
+        orders, products, failures = check_invariants(run, storage)
+        return run, elapsed, orders, products, failures
+
+def summarize(label, run, elapsed):
+    transitions = len(run.orders) + len(run.transitions)   # create + status changes
+    write_latencies = sorted(t for op, v in run.latencies.items() if op in WRITE_OPERATIONS for t in v)
+    p99 = write_latencies[int(len(write_latencies) * 0.99)] if write_latencies else 0
+    ops = sum(len(v) for v in run.latencies.values())
+    print(f"{label:<11}: {ops} ops, {transitions} transitions in {elapsed:.2f}s "
+          f"({transitions / elapsed:.0f} transitions/s, p99 write {p99 * 1000:.1f}ms)")
+
+def contention_delay(concurrent, baseline):
+    """Har op ki latency ka serial mean se upar wala hissa (lock wait + scheduling, dono)"""
+    wait = 0.0
+    for op, latencies in concurrent.latencies.items():
+        base = baseline.latencies.get(op)
+        if not base:
+            continue
+        mean = sum(base) / len(base)
+        wait += sum(max(t - mean, 0) for t in latencies)
+    return wait
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--engine', choices=['sqlite', 'sharded', 'memory'], default='sqlite')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--ops', type=int, default=400, help='operations per worker')
+    parser.add_argument('--serial', action='store_true', help='sirf deterministic serial run')
+    args = parser.parse_args()
+
+    print(f"engine {args.engine}, seed {args.seed}, {args.workers} workers x {args.ops} ops")
+
+    runs = [('serial', True)] + ([] if args.serial else [('concurrent', False)])
+    results = {}
+    failed = False
+    for label, serial in runs:
+        run, elapsed, orders, products, failures = stress(args.engine, args.seed, args.workers, args.ops, serial)
+        results[label] = run
+        summarize(label, run, elapsed)
+        statuses = Counter(status for _, _, _, status in orders.values())
+        print(f"{'':<11}  orders {dict(sorted(statuses.items()))}, sold {sum(1 for s in products.values() if s)}/{len(products)}")
+        for error, count in run.errors.items():
+            print(f"{'':<11}  ❌ {count}x {error}")
+        for failure in failures[:20]:
+            print(f"{'':<11}  ❌ {failure}")
+        failed = failed or bool(failures) or bool(run.errors)
+
+    if 'concurrent' in results:
+        delay = contention_delay(results['concurrent'], results['serial'])
+        writes = sum(len(v) for op, v in results['concurrent'].latencies.items() if op in WRITE_OPERATIONS)
+        print(f"contention : {delay:.2f}s above serial latency across workers ({delay / writes * 1000:.2f}ms per op)")
+
+    if failed:
+        print(f"❌ invariants violated - replay with: --seed {args.seed} --engine {args.engine} --serial")
+        sys.exit(1)
+    print("✅ invariants hold")
+
+if __name__ == '__main__':
+    main()
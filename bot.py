@@ -1,13 +1,27 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import time
+
+# Startup timing report ke liye - baaki imports se pehle
+IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+import csv
+import hashlib
 import logging
 import io
+import json
+import os
 import random
+import signal
 import string
+import tempfile
 from datetime import datetime
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import RetryAfter
+from telegram.helpers import escape_markdown
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -15,13 +29,24 @@ from telegram.ext import (
     MessageHandler,
     filters,
     ContextTypes,
-    ConversationHandler
+    ConversationHandler,
+    TypeHandler,
+    ApplicationHandlerStop
 )
-import qrcode
 
 import config
+import metrics
+import phash
+from ratelimit import TokenBucketLimiter
+from reconcile import reconcile_statement, write_report_csv
+from journal import (JournalingUpdateProcessor, JournalingUpdateQueue, init_journal, close_journal,
+                     get_unfinished_updates, prune_journal)
+from outbox import (init_outbox, prune_outbox, enqueue_message, enqueue_messages, count_unsent_messages,
+                    run_outbox_worker)
 from database import *
 
+startup_timings = {'import': time.perf_counter() - IMPORT_STARTED}
+
 # ====================
 # LOGGING SETUP
 # ====================
@@ -36,6 +61,14 @@ logger = logging.getLogger(__name__)
 # ====================
 ADDING_IDS = 1
 
+# ====================
+# LIMITS
+# ====================
+USERS_LIST_LIMIT = 10
+EXPORT_CHUNK_SIZE = 500
+DELIVERY_BATCH_SIZE = 25           # Telegram ~30 messages/sec limit ke neeche
+DELIVERY_BATCH_INTERVAL_SECONDS = 1
+
 # ====================
 # HELPER FUNCTIONS
 # ====================
@@ -47,6 +80,9 @@ def generate_order_id():
 
 def generate_qr_code(data):
     """QR code generate karta hai"""
+    # qrcode + Pillow heavy hain - pehli baar zaroorat par hi import
+    import qrcode
+    
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -64,10 +100,134 @@ def generate_qr_code(data):
     
     return bio
 
+# ====================
+# SCREENSHOT DUPLICATE INDEX
+# ====================
+screenshot_index = phash.HashIndex(config.SCREENSHOT_DUPLICATE_DISTANCE)
+screenshot_hash_by_order = {}
+_hash_pool = None
+
+def load_screenshot_index():
+    """DB se saved screenshot hashes index mein load karta hai"""
+    for rows in iter_screenshot_hashes():
+        for order_id, user_id, hash_value in rows:
+            screenshot_index.add(hash_value, (order_id, user_id))
+            screenshot_hash_by_order[order_id] = hash_value
+    logger.info(f"🔍 Loaded {len(screenshot_index)} screenshot hashes")
+
+async def check_duplicate_screenshot(photo, order_id, user_id):
+    """Screenshot hash karke pichle near-duplicates return karta hai"""
+    global _hash_pool
+    if _hash_pool is None:
+        from concurrent.futures import ProcessPoolExecutor
+        _hash_pool = ProcessPoolExecutor(max_workers=config.SCREENSHOT_HASH_WORKERS)
+    
+    tg_file = await photo.get_file()
+    image_bytes = bytes(await tg_file.download_as_bytearray())
+    
+    # Hashing CPU-bound hai, event loop block na ho isliye worker pool mein
+    loop = asyncio.get_running_loop()
+    hash_value = await loop.run_in_executor(_hash_pool, phash.dhash, image_bytes)
+    
+    matches = screenshot_index.find(hash_value)
+    screenshot_index.add(hash_value, (order_id, user_id))
+    screenshot_hash_by_order[order_id] = hash_value
+    add_screenshot_hash(order_id, user_id, hash_value)
+    return matches
+
+def find_screenshot_duplicates(order_id):
+    """Order ke saved hash se index mein dobara near-duplicates dhundta hai"""
+    hash_value = screenshot_hash_by_order.get(order_id)
+    if hash_value is None:
+        return []
+    return [match for match in screenshot_index.find(hash_value) if match[1][0] != order_id]
+
+def duplicate_warning(matches):
+    """Near-duplicate matches ki reviewer ke liye warning lines"""
+    text = ""
+    for distance, (dup_order_id, dup_user_id) in matches[:3]:
+        text += (
+            f"⚠️ **Possible duplicate** of `{dup_order_id}` "
+            f"(user `{dup_user_id}`, {distance} bits diff)\n"
+        )
+    return text
+
+def build_delivery_message(order_id, product_data, category, price):
+    """Customer ko bheja jaane wala product delivery message"""
+    return f"""
+✅ **Payment Verified Successfully!**
+
+🎉 **Your Purchased ID:**
+
+`{product_data}`
+
+📦 **Category:** {category}
+💰 **Amount Paid:** ₹{price}
+🆔 **Order ID:** `{order_id}`
+📅 **Delivery Time:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+
+📋 **Instructions:**
+1. Use these credentials to login
+2. Change password if possible
+3. Enjoy the service!
+
+🛡️ **Note:** This is a digital product.
+
+📞 **Support:** {config.SUPPORT_USERNAME}
+
+Thank you for your purchase! 🙏
+"""
+
 def is_admin(user_id):
     """Check if user is admin"""
     return user_id == config.ADMIN_ID
 
+def is_reviewer(user_id):
+    """Check if user can review payments"""
+    return is_admin(user_id) or user_id in config.REVIEWER_IDS
+
+def get_reviewer_ids():
+    """Admin + saare reviewers (bina duplicate)"""
+    return list(dict.fromkeys([config.ADMIN_ID, *config.REVIEWER_IDS]))
+
+# ====================
+# FLOOD PROTECTION
+# ====================
+EXPENSIVE_CALLBACKS = {'confirm_purchase'}
+
+flood_limiter = TokenBucketLimiter(
+    config.FLOOD_RATE, config.FLOOD_BURST, config.FLOOD_MAX_TRACKED_USERS
+)
+expensive_limiter = TokenBucketLimiter(
+    config.EXPENSIVE_RATE, config.EXPENSIVE_BURST, config.FLOOD_MAX_TRACKED_USERS
+)
+
+async def flood_guard(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Har update se pehle chalta hai - spam karne wale users ko DB tak nahi jaane deta"""
+    user = update.effective_user
+    if user is None or is_reviewer(user.id):
+        return
+    
+    query = update.callback_query
+    expensive = query is not None and query.data in EXPENSIVE_CALLBACKS
+    
+    if flood_limiter.allow(user.id):
+        if not expensive or expensive_limiter.allow(user.id):
+            return
+        limiter = expensive_limiter
+        metrics.incr('throttled_expensive')
+    else:
+        limiter = flood_limiter
+    metrics.incr('throttled_updates')
+    
+    if query is not None:
+        # Callback ko answer karna zaroori hai, warna button loading mein atka rehta hai
+        await query.answer("⏳ Too many requests, please slow down!")
+    elif update.effective_message and limiter.warn_once(user.id):
+        await update.effective_message.reply_text("⏳ Too many requests, please wait a moment.")
+    
+    raise ApplicationHandlerStop
+
 # ====================
 # START COMMAND
 # ====================
@@ -116,14 +276,32 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ====================
 # BUY FLOW
 # ====================
+def category_token(category):
+    """Category ka chhota stable id - callback_data 64 bytes ki limit mein rehta hai"""
+    return hashlib.sha1(category.encode()).hexdigest()[:16]
+
+def restock_buttons(available_categories):
+    """Sold out categories ke liye 'notify me' buttons"""
+    buttons = []
+    for category in get_categories():
+        if category not in available_categories:
+            buttons.append([InlineKeyboardButton(
+                f"🔔 Notify me: {category}",
+                callback_data=f'notify_{category_token(category)}'
+            )])
+    return buttons
+
 async def buy_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Buy command handler"""
     products = get_available_products()
     
     if not products:
+        keyboard = restock_buttons(set())
         await update.message.reply_text(
             "❌ **Currently no IDs available!**\n\n"
             "Please check back later or contact admin."
+            + ("\n\n🔔 Get notified when a category is restocked:" if keyboard else ""),
+            reply_markup=InlineKeyboardMarkup(keyboard) if keyboard else None
         )
         return
     
@@ -133,6 +311,7 @@ async def buy_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         button_text = f"{category} - ₹{price}"
         keyboard.append([InlineKeyboardButton(button_text, callback_data=f'select_{product_id}')])
     
+    keyboard.extend(restock_buttons({product[2] for product in products}))
     keyboard.append([InlineKeyboardButton("🔙 Back", callback_data='back_to_main')])
     
     reply_markup = InlineKeyboardMarkup(keyboard)
@@ -143,6 +322,40 @@ async def buy_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         reply_markup=reply_markup
     )
 
+async def subscribe_restock(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Restock notification subscribe (button ya /notify <category>)"""
+    user_id = update.effective_user.id
+    query = update.callback_query
+    categories = get_categories()
+    
+    if query:
+        # Button mein sirf token hai - category list se wapas naam nikalo
+        token = query.data[len('notify_'):]
+        category = next((c for c in categories if category_token(c) == token), None)
+        if category is None:
+            await query.answer("❌ Category not found!", show_alert=True)
+            return
+    else:
+        category = ' '.join(context.args).strip()
+        if not category:
+            await update.message.reply_text(
+                "🔔 Usage: `/notify <category>`\n\nExample: `/notify Netflix`",
+                parse_mode='Markdown'
+            )
+            return
+    
+    if category not in categories:
+        text = f"❌ Category '{category}' not found!"
+    elif add_restock_subscription(user_id, category):
+        text = f"🔔 You will be notified when {category} is restocked!"
+    else:
+        text = f"🔔 You are already subscribed to {category} restocks."
+    
+    if query:
+        await query.answer(text, show_alert=True)
+    else:
+        await update.message.reply_text(text)
+
 async def select_product(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Product selection handler"""
     query = update.callback_query
@@ -204,11 +417,15 @@ async def confirm_purchase(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.edit_message_text("❌ Session expired. Please start again.")
         return
     
-    # Generate order ID
-    order_id = generate_order_id()
-    
-    # Create order in database
-    create_order(order_id, user_id, username, product_id, product_data, price)
+    # Isi product ka pending order pehle se hai (replay hua update / double tap) - wahi use karo,
+    # naya order aur QR nahi banana
+    active = get_order_by_user(user_id)
+    if active and active[7] == 'pending' and active[3] == product_id:
+        order_id = active[0]
+        metrics.incr('purchase_confirm_reused')
+    else:
+        order_id = generate_order_id()
+        create_order(order_id, user_id, username, product_id, product_data, price)
     
     # Generate payment QR
     payment_note = f"Order {order_id} - {username}"
@@ -282,55 +499,49 @@ async def handle_screenshot(update: Update, context: ContextTypes.DEFAULT_TYPE):
     photo = update.message.photo[-1]
     file_id = photo.file_id
     
-    # Update order with screenshot
-    update_order_screenshot(order_id, file_id)
+    # Update order with screenshot (beech mein expire ho gaya ho toh fail)
+    if not update_order_screenshot(order_id, file_id):
+        await update.message.reply_text(
+            "❌ **Order expired!**\n\n"
+            "Please start a new order using /buy"
+        )
+        return
+    
+    # Check for reused / edited screenshots
+    duplicate_text = ""
+    try:
+        matches = await check_duplicate_screenshot(photo, order_id, user_id)
+        duplicate_text = duplicate_warning(matches)
+    except Exception as e:
+        logger.error(f"Error checking duplicate screenshot: {e}")
+    
+    queue = get_review_queue()
     
-    # Notify admin
+    # Notify reviewers - jo pehle /next karega use order milega
     admin_message = f"""
 🆕 **New Payment Pending!**
-
-👤 **User:** @{username}
+{duplicate_text}
+👤 **User:** @{escape_markdown(username)}
 🆔 **User ID:** `{user_id}`
 💰 **Amount:** ₹{order[5]}
 🆔 **Order ID:** `{order_id}`
-📦 **Product:** {order[4]}
 📅 **Time:** {order[8]}
 
-**Quick Actions:**
-✅ Approve: `/approve_{order_id}`
-❌ Reject: `/reject_{order_id}`
+⏳ **In queue:** {queue['waiting']}
+👉 Claim next order: /next
     """
     
-    try:
-        # Send notification to admin
-        await context.bot.send_message(
-            chat_id=config.ADMIN_ID,
-            text=admin_message,
-            parse_mode='Markdown'
-        )
-        
-        # Forward screenshot to admin
-        await context.bot.send_photo(
-            chat_id=config.ADMIN_ID,
-            photo=file_id,
-            caption=f"Payment screenshot for order {order_id}"
-        )
-        
-        # Confirm to user
-        await update.message.reply_text(
-            "✅ **Payment screenshot received!**\n\n"
-            "Admin verification in progress...\n"
-            "You will receive your ID shortly.\n\n"
-            "⏳ Usually takes 5-10 minutes.\n"
-            f"📞 Contact: {config.SUPPORT_USERNAME}"
-        )
-        
-    except Exception as e:
-        logger.error(f"Error notifying admin: {e}")
-        await update.message.reply_text(
-            "⚠️ **Screenshot received but admin notification failed!**\n\n"
-            f"Please contact admin directly: {config.SUPPORT_USERNAME}"
-        )
+    # Outbox se jaata hai - restart / flood limit par bhi notification khoti nahi
+    enqueue_messages([(reviewer_id, admin_message, 'Markdown') for reviewer_id in get_reviewer_ids()])
+    
+    # Confirm to user
+    await update.message.reply_text(
+        "✅ **Payment screenshot received!**\n\n"
+        "Admin verification in progress...\n"
+        "You will receive your ID shortly.\n\n"
+        "⏳ Usually takes 5-10 minutes.\n"
+        f"📞 Contact: {config.SUPPORT_USERNAME}"
+    )
 
 # ====================
 # ADMIN COMMANDS
@@ -413,6 +624,7 @@ async def handle_add_ids(update: Update, context: ContextTypes.DEFAULT_TYPE):
     added_count = 0
     duplicate_count = 0
     error_count = 0
+    restocked_categories = set()
     
     for line in lines:
         line = line.strip()
@@ -428,6 +640,7 @@ async def handle_add_ids(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 
                 if add_product(product_data, category, price):
                     added_count += 1
+                    restocked_categories.add(category)
                 else:
                     duplicate_count += 1
         except ValueError:
@@ -450,6 +663,10 @@ View all IDs: /viewids
     
     await update.message.reply_text(report)
     
+    # Subscribers ko background mein batao - handler block nahi hota
+    for category in restocked_categories:
+        start_restock_fanout(context.application, category, update.effective_chat.id)
+    
     return ConversationHandler.END
 
 async def view_ids_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -477,7 +694,7 @@ async def view_ids_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def pending_orders_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """View pending orders"""
-    if not is_admin(update.effective_user.id):
+    if not is_reviewer(update.effective_user.id):
         await update.message.reply_text("❌ Access denied!")
         return
     
@@ -493,7 +710,7 @@ async def pending_orders_command(update: Update, context: ContextTypes.DEFAULT_T
         order_id, user_id, username, product_id, product_data, amount, screenshot_id, status, order_date, admin_date, admin_id = order
         
         message += f"🆔 **Order:** `{order_id}`\n"
-        message += f"👤 **User:** @{username} (`{user_id}`)\n"
+        message += f"👤 **User:** @{escape_markdown(username)} (`{user_id}`)\n"
         message += f"💰 **Amount:** ₹{amount}\n"
         message += f"📅 **Time:** {order_date}\n"
         message += f"✅ **Approve:** `/approve_{order_id}`\n"
@@ -502,9 +719,48 @@ async def pending_orders_command(update: Update, context: ContextTypes.DEFAULT_T
     
     await update.message.reply_text(message, parse_mode='Markdown')
 
+async def claim_next_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Review queue se agla order claim karta hai"""
+    reviewer_id = update.effective_user.id
+    if not is_reviewer(reviewer_id):
+        await update.message.reply_text("❌ Access denied!")
+        return
+    
+    order = claim_next_order(reviewer_id, config.REVIEW_LEASE_SECONDS)
+    
+    if not order:
+        await update.message.reply_text("✅ Review queue is empty!")
+        return
+    
+    order_id, user_id, username, product_id, product_data, amount, screenshot_id, status, order_date, admin_date, admin_id = order
+    lease_minutes = config.REVIEW_LEASE_SECONDS // 60
+    
+    # Reviewer yahin se approve karta hai - near-duplicate warning bhi yahin
+    await update.message.reply_text(
+        f"📋 **Order claimed for {lease_minutes} min**\n\n"
+        f"{duplicate_warning(find_screenshot_duplicates(order_id))}"
+        f"👤 **User:** @{escape_markdown(username)} (`{user_id}`)\n"
+        f"💰 **Amount:** ₹{amount}\n"
+        f"🆔 **Order ID:** `{order_id}`\n"
+        f"📦 **Product:** {escape_markdown(product_data)}\n"
+        f"📅 **Time:** {order_date}\n\n"
+        f"**Quick Actions:**\n"
+        f"✅ Approve: `/approve_{order_id}`\n"
+        f"❌ Reject: `/reject_{order_id}`\n\n"
+        f"_Lease expire hone par order wapas queue mein chala jayega._",
+        parse_mode='Markdown'
+    )
+    
+    if screenshot_id:
+        await context.bot.send_photo(
+            chat_id=reviewer_id,
+            photo=screenshot_id,
+            caption=f"Payment screenshot for order {order_id}"
+        )
+
 async def approve_order_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Approve order manually"""
-    if not is_admin(update.effective_user.id):
+    if not is_reviewer(update.effective_user.id):
         await update.message.reply_text("❌ Access denied!")
         return
     
@@ -539,55 +795,33 @@ async def approve_order_command(update: Update, context: ContextTypes.DEFAULT_TY
     category = product[2]
     price = product[3]
     
-    # Approve order
-    approve_order(order_id, update.effective_user.id)
-    
-    # Send product to customer
-    try:
-        delivery_message = f"""
-✅ **Payment Verified Successfully!**
-
-🎉 **Your Purchased ID:**
-
-`{product_data}`
-
-📦 **Category:** {category}
-💰 **Amount Paid:** ₹{price}
-🆔 **Order ID:** `{order_id}`
-📅 **Delivery Time:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-📋 **Instructions:**
-1. Use these credentials to login
-2. Change password if possible
-3. Enjoy the service!
-
-🛡️ **Note:** This is a digital product.
-
-📞 **Support:** {config.SUPPORT_USERNAME}
-
-Thank you for your purchase! 🙏
-"""
-        
-        await context.bot.send_message(
-            chat_id=order[1],  # user_id
-            text=delivery_message,
-            parse_mode='Markdown'
-        )
-        
+    if not claim_order(order_id, update.effective_user.id, config.REVIEW_LEASE_SECONDS):
         await update.message.reply_text(
-            f"✅ Order `{order_id}` approved and delivered to user!",
+            f"🔒 Order `{order_id}` is being reviewed by another reviewer!",
             parse_mode='Markdown'
         )
-        
-    except Exception as e:
-        logger.error(f"Error delivering product: {e}")
+        return
+    
+    # Approve order (guarded - dusre reviewer ne handle kiya ya product bik gaya toh fail)
+    if not approve_order(order_id, update.effective_user.id):
         await update.message.reply_text(
-            f"⚠️ Order approved but delivery failed: {e}"
+            f"❌ Order `{order_id}` could not be approved - already handled or product already sold!",
+            parse_mode='Markdown'
         )
+        return
+    
+    # Send product to customer (outbox retry karta hai jab tak deliver na ho)
+    delivery_message = build_delivery_message(order_id, product_data, category, price)
+    enqueue_message(order[1], delivery_message)  # user_id
+    
+    await update.message.reply_text(
+        f"✅ Order `{order_id}` approved! Delivery queued for user.",
+        parse_mode='Markdown'
+    )
 
 async def reject_order_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Reject order"""
-    if not is_admin(update.effective_user.id):
+    if not is_reviewer(update.effective_user.id):
         await update.message.reply_text("❌ Access denied!")
         return
     
@@ -600,24 +834,36 @@ async def reject_order_command(update: Update, context: ContextTypes.DEFAULT_TYP
         await update.message.reply_text(f"❌ Order `{order_id}` not found!", parse_mode='Markdown')
         return
     
-    # Reject order
-    reject_order(order_id, update.effective_user.id)
+    # Pending (bina screenshot) order review queue mein nahi hota - lease sirf waiting orders par
+    if order[7] == 'waiting_approval' and not claim_order(
+            order_id, update.effective_user.id, config.REVIEW_LEASE_SECONDS):
+        await update.message.reply_text(
+            f"🔒 Order `{order_id}` is being reviewed by another reviewer!",
+            parse_mode='Markdown'
+        )
+        return
     
-    # Notify user
-    try:
-        await context.bot.send_message(
-            chat_id=order[1],  # user_id
-            text=f"❌ **Order Rejected**\n\n"
-                 f"Your order `{order_id}` has been rejected by admin.\n\n"
-                 f"**Possible reasons:**\n"
-                 f"• Invalid payment screenshot\n"
-                 f"• Payment not received\n"
-                 f"• Wrong amount\n\n"
-                 f"Please contact admin for more details.\n"
-                 f"📞 {config.SUPPORT_USERNAME}"
+    # Reject order (approved order kabhi reject nahi hota)
+    if not reject_order(order_id, update.effective_user.id):
+        await update.message.reply_text(
+            f"❌ Order `{order_id}` is already {get_order_by_id(order_id)[7]}!",
+            parse_mode='Markdown'
         )
-    except Exception as e:
-        logger.error(f"Error notifying user: {e}")
+        return
+    
+    # Notify user
+    enqueue_message(
+        order[1],  # user_id
+        f"❌ **Order Rejected**\n\n"
+        f"Your order `{order_id}` has been rejected by admin.\n\n"
+        f"**Possible reasons:**\n"
+        f"• Invalid payment screenshot\n"
+        f"• Payment not received\n"
+        f"• Wrong amount\n\n"
+        f"Please contact admin for more details.\n"
+        f"📞 {config.SUPPORT_USERNAME}",
+        parse_mode=None
+    )
     
     await update.message.reply_text(
         f"❌ Order `{order_id}` rejected! User notified.",
@@ -632,6 +878,19 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     stats = get_stats()
     
+    queue = get_review_queue()
+    reviewers_text = ""
+    for reviewer in get_reviewer_stats():
+        reviewers_text += (
+            f"• `{reviewer['reviewer_id']}`: {reviewer['completed']} done, "
+            f"wait {reviewer['avg_wait_seconds'] / 60:.1f}m, "
+            f"handle {reviewer['avg_handle_seconds'] / 60:.1f}m\n"
+        )
+    
+    cache_hits = metrics.get('active_order_cache_hits')
+    cache_lookups = cache_hits + metrics.get('active_order_cache_misses')
+    cache_hit_rate = 100 * cache_hits / cache_lookups if cache_lookups else 0
+    
     message = f"""
 📊 **Bot Statistics**
 
@@ -647,20 +906,473 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 💵 **Revenue:** ₹{stats['total_revenue']}
 
+🧾 **Review Queue:** {queue['waiting']} waiting (oldest {queue['oldest_wait_seconds'] / 60:.1f}m)
+{reviewers_text}
 👥 **Users:** {stats['total_users']}
 
+⚡ **Order Cache Hit Rate:** {cache_hit_rate:.1f}%
+
+🛡️ **Throttled:** {metrics.get('throttled_updates')} updates ({metrics.get('throttled_expensive')} purchases)
+
 🔄 **Last Updated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """
     
     await update.message.reply_text(message)
 
 async def view_users(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """View all users"""
+    """View users summary"""
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("❌ Access denied!")
+        return
+    
+    total_users = get_user_count()
+    
+    if not total_users:
+        await update.message.reply_text("📭 No users yet!")
+        return
+    
+    message = f"👥 **Users:** {total_users}\n\n"
+    
+    # Usernames mein '_' aam hai - escape na karo toh Telegram poora message reject karta hai
+    message += "💰 **Top Customers:**\n"
+    for idx, user in enumerate(get_top_users(USERS_LIST_LIMIT), 1):
+        user_id, username, first_name, join_date, total_orders, total_spent = user
+        message += f"{idx}. @{escape_markdown(username or '')} (`{user_id}`) - {total_orders} orders, ₹{total_spent}\n"
+    
+    message += "\n🆕 **Recent Users:**\n"
+    for idx, user in enumerate(get_recent_users(USERS_LIST_LIMIT), 1):
+        user_id, username, first_name, join_date, total_orders, total_spent = user
+        message += f"{idx}. @{escape_markdown(username or '')} (`{user_id}`) - {join_date}\n"
+    
+    message += "\n📄 Full list: /exportusers"
+    
+    await update.message.reply_text(message, parse_mode='Markdown')
+
+def write_users_csv(fileobj):
+    """Users ko CSV mein chunk by chunk likhta hai"""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    writer.writerow(['user_id', 'username', 'first_name', 'join_date', 'total_orders', 'total_spent'])
+    
+    count = 0
+    for rows in iter_users(EXPORT_CHUNK_SIZE):
+        writer.writerows(rows)
+        count += len(rows)
+    
+    text.flush()
+    text.detach()
+    fileobj.seek(0)
+    return count
+
+async def export_users_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Export all users as CSV document"""
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("❌ Access denied!")
+        return
+    
+    # Temp file on disk, so memory stays flat for any number of users
+    with tempfile.TemporaryFile() as fileobj:
+        count = await asyncio.to_thread(write_users_csv, fileobj)
+        
+        if not count:
+            await update.message.reply_text("📭 No users yet!")
+            return
+        
+        await update.message.reply_document(
+            document=fileobj,
+            filename=f"users_{datetime.now().strftime('%Y%m%d%H%M%S')}.csv",
+            caption=f"👥 {count} users exported"
+        )
+
+# ====================
+# OUTBOUND SENDS
+# ====================
+# Zaroori messages (deliveries, reviewer alerts) outbox se jaate hain; yeh
+# helpers sirf best-effort sends (restock alerts) ke liye hain.
+async def send_with_retry(bot, chat_id, text):
+    """Flood limit (RetryAfter) par wait karke ek baar dobara bhejta hai"""
+    for attempt in range(2):
+        try:
+            await bot.send_message(chat_id=chat_id, text=text, parse_mode='Markdown')
+            return True
+        except RetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+        except Exception as e:
+            logger.error(f"Error sending message to {chat_id}: {e}")
+            return False
+    return False
+
+async def pace_batch(batch_started):
+    """Batch interval ka baaki time wait karta hai (send time minus karke)"""
+    remaining = DELIVERY_BATCH_INTERVAL_SECONDS - (time.monotonic() - batch_started)
+    if remaining > 0:
+        await asyncio.sleep(remaining)
+
+# ====================
+# RESTOCK NOTIFICATIONS
+# ====================
+RESTOCK_CHUNK_SIZE = 500
+
+_running_fanouts = set()
+
+def start_restock_fanout(application, category, admin_chat_id):
+    """Category ka fan-out background task shuru karta hai (ek waqt mein ek)"""
+    if category in _running_fanouts:
+        return
+    _running_fanouts.add(category)
+    # Shutdown par cancel ho toh bhi theek - subscription notify hone ke baad hi hatti hai
+    start_background(restock_fanout(application.bot, category, admin_chat_id))
+
+async def restock_fanout(bot, category, admin_chat_id):
+    """Restock subscribers ko chunks aur rate-limited batches mein notify karta hai"""
+    started = time.monotonic()
+    sent = 0
+    failed = 0
+    last_user_id = 0
+    # Category naam mein '_' / '*' ho toh Markdown parse fail - har send fail ho jaata
+    text = (
+        f"🔔 **{escape_markdown(category)} is back in stock!**\n\n"
+        f"Buy now before it sells out: /buy"
+    )
+    
+    try:
+        while True:
+            # Indexed keyset query, ek chunk at a time - saare rows memory mein nahi
+            user_ids = await asyncio.to_thread(
+                get_restock_subscribers, category, last_user_id, RESTOCK_CHUNK_SIZE
+            )
+            if not user_ids:
+                break
+            last_user_id = user_ids[-1]
+            
+            notified = []
+            for start in range(0, len(user_ids), DELIVERY_BATCH_SIZE):
+                batch_started = time.monotonic()
+                for user_id in user_ids[start:start + DELIVERY_BATCH_SIZE]:
+                    if await send_with_retry(bot, user_id, text):
+                        sent += 1
+                        notified.append(user_id)
+                    else:
+                        failed += 1
+                await pace_batch(batch_started)
+            
+            # Notify ho gaye toh subscription khatam; failed wale agle restock par dobara
+            await asyncio.to_thread(remove_restock_subscriptions, category, notified)
+    finally:
+        _running_fanouts.discard(category)
+    
+    elapsed = time.monotonic() - started
+    metrics.incr('restock_notifications_sent', sent)
+    metrics.incr('restock_notifications_failed', failed)
+    
+    if sent or failed:
+        rate = sent / elapsed if elapsed else 0
+        logger.info(f"🔔 Restock fan-out {category}: {sent} sent, {failed} failed in {elapsed:.1f}s")
+        await send_with_retry(
+            bot, admin_chat_id,
+            f"🔔 **Restock notifications: {escape_markdown(category)}**\n\n"
+            f"✅ Sent: {sent}\n"
+            f"❌ Failed: {failed}\n"
+            f"⏱️ Time: {elapsed:.1f}s ({rate:.1f} msg/s)"
+        )
+
+# ====================
+# STATEMENT RECONCILIATION
+# ====================
+async def reconcile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Reconciliation instructions"""
     if not is_admin(update.effective_user.id):
         await update.message.reply_text("❌ Access denied!")
         return
     
-    users = get_all_users()
+    await update.message.reply_text(
+        "📄 **Bank / UPI Statement Reconciliation**\n\n"
+        "Statement ko CSV file ki tarah bhejein, caption mein `/reconcile` likh kar.\n\n"
+        "Jin rows mein Order ID aur sahi amount hoga, woh orders automatically "
+        "approve hokar deliver ho jayenge.",
+        parse_mode='Markdown'
+    )
+
+def run_reconciliation(path):
+    """Statement file stream karke pending orders se match karta hai"""
+    pending_orders = get_pending_orders()
+    with open(path, newline='', encoding='utf-8-sig', errors='replace') as statement:
+        return reconcile_statement(statement, pending_orders)
+
+def write_reconcile_report(report, fileobj):
+    """Mismatched / unmatched rows ka CSV report"""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8', newline='')
+    write_report_csv(report, text)
+    text.flush()
+    text.detach()
+    fileobj.seek(0)
+
+def build_deliveries(orders):
+    """Approved orders ke delivery messages (chat_id, text, parse_mode)"""
+    messages = []
+    for order in orders:
+        order_id, user_id, product_id = order[0], order[1], order[3]
+        product = get_product_by_id(product_id)
+        if product:
+            messages.append((user_id, build_delivery_message(order_id, product[1], product[2], product[3]), 'Markdown'))
+        else:
+            logger.error(f"Product {product_id} not found for approved order {order_id}")
+    return messages
+
+async def handle_statement(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Statement CSV se matched orders bulk approve karta hai"""
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("❌ Access denied!")
+        return
     
-    if not users:
-        await update.mess
\ No newline at end of file
+    tg_file = await update.message.document.get_file()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'statement.csv')
+        await tg_file.download_to_drive(path)
+        try:
+            report = await asyncio.to_thread(run_reconciliation, path)
+        except (ValueError, csv.Error) as e:
+            await update.message.reply_text(f"❌ Could not read statement: {e}")
+            return
+    
+    # Saare matched orders ek transaction mein
+    order_ids = [order_id for _, order_id, _ in report['matched']]
+    approved = await asyncio.to_thread(approve_orders, order_ids, update.effective_user.id)
+    
+    # Parse ke baad state badal gayi ya product bik gaya - paid customer report mein dikhe
+    approved_ids = {order[0] for order in approved}
+    report['not_approved'] = [m for m in report['matched'] if m[1] not in approved_ids]
+    
+    if approved:
+        # Outbox worker rate limit ke andar deliver karta hai
+        enqueue_messages(await asyncio.to_thread(build_deliveries, approved))
+    
+    await update.message.reply_text(
+        f"📊 **Reconciliation Report**\n\n"
+        f"📄 Rows: {report['rows']}\n"
+        f"✅ Approved: {len(approved)}\n"
+        f"⛔ Matched but not approved: {len(report['not_approved'])}\n"
+        f"⚠️ Amount mismatch: {len(report['mismatched'])}\n"
+        f"❓ Unmatched: {len(report['unmatched'])}\n\n"
+        f"{'📬 Deliveries queued.' if approved else ''}"
+    )
+    
+    if report['mismatched'] or report['unmatched'] or report['not_approved']:
+        with tempfile.TemporaryFile() as fileobj:
+            await asyncio.to_thread(write_reconcile_report, report, fileobj)
+            await update.message.reply_document(
+                document=fileobj,
+                filename=f"reconcile_report_{datetime.now().strftime('%Y%m%d%H%M%S')}.csv",
+                caption="Mismatched / unmatched / not approved statement rows"
+            )
+
+# ====================
+# BACKGROUND JOBS
+# ====================
+ORDER_EXPIRY_INTERVAL_SECONDS = 60
+
+async def expire_orders_loop():
+    """Bina payment wale purane orders periodically expire karta hai"""
+    while True:
+        try:
+            expired = await asyncio.to_thread(expire_stale_orders, config.PAYMENT_TIMEOUT_MINUTES)
+            if expired:
+                logger.info(f"⌛ Expired {len(expired)} unpaid orders")
+        except Exception as e:
+            logger.error(f"Error expiring orders: {e}")
+        await asyncio.sleep(ORDER_EXPIRY_INTERVAL_SECONDS)
+
+def prewarm_qr():
+    """qrcode / Pillow import aur pehla QR pehle se bana leta hai"""
+    started = time.perf_counter()
+    generate_qr_code("upi://pay?pa=prewarm")
+    logger.info(f"🔥 QR pre-warm done in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+def log_startup_timings():
+    """Import / db / network startup time log karta hai"""
+    total = time.perf_counter() - IMPORT_STARTED
+    logger.info(
+        f"⏱️ Startup: import {startup_timings['import'] * 1000:.0f}ms, "
+        f"db {startup_timings['db'] * 1000:.0f}ms, "
+        f"network {startup_timings['network'] * 1000:.0f}ms, "
+        f"total {total * 1000:.0f}ms"
+    )
+
+# ====================
+# RUN LOOP & GRACEFUL SHUTDOWN
+# ====================
+_background_tasks = set()
+
+def start_background(coro):
+    """Long-running background task - shutdown par drain ke baad cancel hota hai"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+async def replay_unfinished_updates(application):
+    """Pichle run ke deferred / adhoore updates dobara queue mein daalta hai"""
+    rows = await asyncio.to_thread(get_unfinished_updates)
+    for update_id, payload, status in rows:
+        await application.update_queue.put(Update.de_json(json.loads(payload), application.bot))
+    if rows:
+        logger.info(f"♻️ Replaying {len(rows)} unfinished updates from last run")
+
+async def drain(application, processor, outbox_stopping, outbox_task):
+    """Naye updates defer karta hai, in-flight kaam aur outbox deadline tak khatam karta hai"""
+    started = time.monotonic()
+    deadline = started + config.DRAIN_DEADLINE_SECONDS
+    
+    def remaining():
+        return max(deadline - time.monotonic(), 0)
+    
+    logger.info("🛑 Shutting down - draining in-flight work...")
+    
+    # Ab se aaye updates process nahi honge, journal mein deferred likhe jayenge
+    processor.draining = True
+    
+    # Polling band; Telegram ko fetched updates ka offset confirm ho jata hai
+    try:
+        await asyncio.wait_for(application.updater.stop(), remaining())
+    except asyncio.TimeoutError:
+        logger.warning("⚠️ Updater did not stop before drain deadline")
+    
+    # In-flight handler khatam hone ka wait (queue mein bache updates deferred hote hain)
+    try:
+        await asyncio.wait_for(application.stop(), remaining())
+    except asyncio.TimeoutError:
+        logger.warning("⚠️ In-flight update did not finish in time - it will be replayed on next start")
+        await processor.cancel_in_flight()
+    
+    # Outbox khali karne ki koshish; bache messages DB mein rehte hain
+    outbox_stopping.set()
+    try:
+        await asyncio.wait_for(outbox_task, remaining())
+    except asyncio.TimeoutError:
+        pass
+    
+    for task in list(_background_tasks):
+        task.cancel()
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
+    
+    try:
+        await application.shutdown()
+    except RuntimeError as e:
+        logger.warning(f"⚠️ Application shutdown incomplete: {e}")
+    close_journal()
+    
+    logger.info(
+        f"👋 Drained in {time.monotonic() - started:.1f}s: "
+        f"{metrics.get('updates_deferred')} updates deferred, "
+        f"{count_unsent_messages()} messages left in outbox"
+    )
+
+async def run_bot(application, processor):
+    """Polling chalata hai; SIGINT / SIGTERM par drain karke band hota hai"""
+    stop_requested = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_requested.set)
+    
+    network_started = time.perf_counter()
+    await application.initialize()  # get_me etc.
+    startup_timings['network'] = time.perf_counter() - network_started
+    log_startup_timings()
+    
+    outbox_stopping = asyncio.Event()
+    outbox_task = asyncio.create_task(run_outbox_worker(application.bot, outbox_stopping))
+    start_background(expire_orders_loop())
+    if config.QR_PREWARM:
+        start_background(asyncio.to_thread(prewarm_qr))
+    
+    await application.start()
+    await replay_unfinished_updates(application)
+    await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+    logger.info("🤖 Bot started!")
+    
+    await stop_requested.wait()
+    await drain(application, processor, outbox_stopping, outbox_task)
+
+# ====================
+# MAIN
+# ====================
+def prepare_storage():
+    """Database, journal, outbox aur screenshot index ready karta hai"""
+    db_started = time.perf_counter()
+    init_database()
+    init_journal()
+    init_outbox()
+    pruned = prune_journal()
+    if pruned:
+        logger.info(f"🧹 Pruned {pruned} old journal entries")
+    pruned = prune_outbox()
+    if pruned:
+        logger.info(f"🧹 Pruned {pruned} old outbox messages")
+    load_screenshot_index()
+    startup_timings['db'] = time.perf_counter() - db_started
+
+def build_application(processor):
+    """Application banakar saare handlers register karta hai"""
+    application = (
+        Application.builder()
+        .token(config.BOT_TOKEN)
+        .base_url(config.BOT_API_BASE_URL)
+        .update_queue(JournalingUpdateQueue())
+        .concurrent_updates(processor)
+        .build()
+    )
+    
+    add_ids_handler = ConversationHandler(
+        entry_points=[CommandHandler('addids', add_ids_command)],
+        states={
+            ADDING_IDS: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_add_ids)]
+        },
+        fallbacks=[CommandHandler('cancel', lambda u, c: ConversationHandler.END)]
+    )
+    
+    # Flood protection runs before every other handler
+    application.add_handler(TypeHandler(Update, flood_guard), group=-1)
+    
+    # User commands
+    application.add_handler(CommandHandler('start', start))
+    application.add_handler(CommandHandler('buy', buy_command))
+    application.add_handler(CommandHandler('notify', subscribe_restock))
+    
+    # Admin commands
+    application.add_handler(add_ids_handler)
+    application.add_handler(CommandHandler('admin', admin_start))
+    application.add_handler(CommandHandler('viewids', view_ids_command))
+    application.add_handler(CommandHandler('pending', pending_orders_command))
+    application.add_handler(CommandHandler('stats', stats_command))
+    application.add_handler(CommandHandler('users', view_users))
+    application.add_handler(CommandHandler('exportusers', export_users_command))
+    application.add_handler(CommandHandler('next', claim_next_command))
+    application.add_handler(CommandHandler('reconcile', reconcile_command))
+    application.add_handler(MessageHandler(
+        filters.Document.FileExtension('csv') & filters.CaptionRegex(r'^/reconcile'),
+        handle_statement
+    ))
+    application.add_handler(MessageHandler(filters.Regex(r'^/approve_'), approve_order_command))
+    application.add_handler(MessageHandler(filters.Regex(r'^/reject_'), reject_order_command))
+    
+    # Callbacks
+    application.add_handler(CallbackQueryHandler(select_product, pattern=r'^select_\d+$'))
+    application.add_handler(CallbackQueryHandler(confirm_purchase, pattern='^confirm_purchase$'))
+    application.add_handler(CallbackQueryHandler(admin_panel, pattern='^admin_panel$'))
+    application.add_handler(CallbackQueryHandler(subscribe_restock, pattern='^notify_'))
+    
+    # Payment screenshots
+    application.add_handler(MessageHandler(filters.PHOTO, handle_screenshot))
+    
+    return application
+
+def main():
+    """Bot start karta hai"""
+    prepare_storage()
+    processor = JournalingUpdateProcessor()
+    application = build_application(processor)
+    asyncio.run(run_bot(application, processor))
+
+if __name__ == '__main__':
+    main()
@@ -8,15 +8,50 @@ BOT_TOKEN = "8407710740:AAFmVmtlcTRyI8K325pEf6IJAYv-KO4Gwh8"
 # Your Telegram User ID
 ADMIN_ID = 8472134640
 
+# Payment Reviewers (can claim and approve/reject orders)
+REVIEWER_IDS = [ADMIN_ID]
+REVIEW_LEASE_SECONDS = 300
+
 # Your UPI Details
 UPI_ID = "testingbot@pthdfc"
 UPI_NAME = "Maarja Uky"
 
+# Storage Engine: 'sqlite', 'sharded' or 'memory'
+STORAGE_ENGINE = 'sqlite'
+DATABASE_PATH = 'bot_database.db'
+DATABASE_SHARD_PATHS = [f'bot_database_{i}.db' for i in range(4)]
+# Max users whose active order is kept in memory (LRU)
+ACTIVE_ORDER_CACHE_SIZE = 10000
+
+# Telegram Bot API endpoint (local Bot API server ke liye badal sakte hain)
+BOT_API_BASE_URL = 'https://api.telegram.org/bot'
+
+# Runtime state (update journal + outbound message outbox)
+RUNTIME_DB_PATH = 'bot_runtime.db'
+# Max seconds to finish in-flight work and pending sends on shutdown
+DRAIN_DEADLINE_SECONDS = 20
+
 # Default Pricing
 DEFAULT_PRICE = 50
 
 # Payment Settings
 PAYMENT_TIMEOUT_MINUTES = 30
 
+# Duplicate Screenshot Detection
+# Max differing bits (out of 64) to flag a screenshot as near-duplicate
+SCREENSHOT_DUPLICATE_DISTANCE = 5
+SCREENSHOT_HASH_WORKERS = 2
+
+# Flood Protection (per user token buckets)
+FLOOD_RATE = 1.0               # updates per second refill
+FLOOD_BURST = 5                # max burst
+EXPENSIVE_RATE = 1 / 30        # confirm_purchase refill (1 per 30 sec)
+EXPENSIVE_BURST = 2
+FLOOD_MAX_TRACKED_USERS = 50000
+
+# Startup
+# Generate one QR in the background at startup so the first buyer doesn't wait
+QR_PREWARM = True
+
 # Support Contact
 SUPPORT_USERNAME = "@maarjauky"
\ No newline at end of file
@@ -1,226 +1,250 @@
-import sqlite3
 import logging
+import threading
+from collections import OrderedDict
+
+import config
+import metrics
+from storage import SQLiteStorage, MemoryStorage, ShardedSQLiteStorage
 
 logger = logging.getLogger(__name__)
 
+# ====================
+# STORAGE ENGINE
+# ====================
+def create_storage(engine=None):
+    """Config ke hisaab se storage engine banata hai"""
+    engine = engine or config.STORAGE_ENGINE
+    if engine == 'sqlite':
+        return SQLiteStorage(config.DATABASE_PATH)
+    if engine == 'sharded':
+        return ShardedSQLiteStorage(config.DATABASE_SHARD_PATHS)
+    if engine == 'memory':
+        return MemoryStorage()
+    raise ValueError(f"Unknown storage engine: {engine}")
+
+_storage = create_storage()
+
+def get_storage():
+    """Current storage engine"""
+    return _storage
+
+def set_storage(storage):
+    """Storage engine badalta hai (tests / benchmarks ke liye)"""
+    global _storage
+    _storage = storage
+    clear_active_order_cache()
+
+# ====================
+# ACTIVE ORDER CACHE
+# ====================
+# user_id -> latest pending/waiting_approval order row (None = koi active order nahi).
+# Order write karne wale saare functions isse write-through update karte hain.
+_active_orders = OrderedDict()
+_active_orders_lock = threading.Lock()
+_active_orders_version = 0
+
+def _cache_active_order(user_id, order, version=None):
+    """Cache mein user ka active order rakhta hai (LRU)
+
+    version diya ho toh yeh DB read ka result hai - beech mein koi write hua
+    ho toh purana read cache nahi karte. Bina version ke yeh write-through hai.
+    """
+    global _active_orders_version
+    with _active_orders_lock:
+        if version is None:
+            _active_orders_version += 1
+        elif version != _active_orders_version:
+            return
+        _active_orders[user_id] = order
+        _active_orders.move_to_end(user_id)
+        if len(_active_orders) > config.ACTIVE_ORDER_CACHE_SIZE:
+            _active_orders.popitem(last=False)
+
+def _refresh_active_order(user_id, order):
+    """Cached order wahi ho toh naya row rakhta hai, warna entry hata deta hai"""
+    global _active_orders_version
+    with _active_orders_lock:
+        _active_orders_version += 1
+        cached = _active_orders.get(user_id)
+        if cached is not None and cached[0] == order[0]:
+            _active_orders[user_id] = order
+        else:
+            _active_orders.pop(user_id, None)
+
+def _invalidate_active_order(user_id):
+    """User ka cached active order hata deta hai"""
+    global _active_orders_version
+    with _active_orders_lock:
+        _active_orders_version += 1
+        _active_orders.pop(user_id, None)
+
+def clear_active_order_cache():
+    """Poora active order cache khali karta hai"""
+    global _active_orders_version
+    with _active_orders_lock:
+        _active_orders_version += 1
+        _active_orders.clear()
+
 def init_database():
     """Database tables create karta hai"""
-    conn = sqlite3.connect('bot_database.db')
-    c = conn.cursor()
-    
-    # Products table
-    c.execute('''CREATE TABLE IF NOT EXISTS products
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  product_data TEXT UNIQUE NOT NULL,
-                  category TEXT,
-                  price INTEGER DEFAULT 50,
-                  sold INTEGER DEFAULT 0,
-                  added_date DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-    
-    # Orders table
-    c.execute('''CREATE TABLE IF NOT EXISTS orders
-                 (order_id TEXT PRIMARY KEY,
-                  user_id INTEGER NOT NULL,
-                  username TEXT,
-                  product_id INTEGER,
-                  product_data TEXT,
-                  amount INTEGER,
-                  screenshot_id TEXT,
-                  status TEXT DEFAULT 'pending',
-                  order_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                  admin_action_date DATETIME,
-                  admin_id INTEGER)''')
-    
-    # Users table
-    c.execute('''CREATE TABLE IF NOT EXISTS users
-                 (user_id INTEGER PRIMARY KEY,
-                  username TEXT,
-                  first_name TEXT,
-                  join_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                  total_orders INTEGER DEFAULT 0,
-                  total_spent INTEGER DEFAULT 0)''')
-    
-    conn.commit()
-    conn.close()
-    logger.info("✅ Database initialized successfully!")
+    if _storage.init_database():
+        logger.info("✅ Database initialized successfully!")
+    else:
+        logger.info("✅ Database schema up to date")
 
 def add_product(product_data, category="General", price=50):
     """New product add karta hai"""
-    conn = sqlite3.connect('bot_database.db')
-    c = conn.cursor()
-    try:
-        c.execute('''INSERT INTO products (product_data, category, price) 
-                     VALUES (?, ?, ?)''', (product_data, category, price))
-        conn.commit()
-        return c.lastrowid
-    except sqlite3.IntegrityError:
-        return None
-    finally:
-        conn.close()
+    return _storage.add_product(product_data, category, price)
 
 def get_available_products():
     """Available products return karta hai"""
-    conn = sqlite3.connect('bot_database.db')
-    c = conn.cursor()
-    c.execute('''SELECT id, product_data, category, price 
-                 FROM products WHERE sold = 0 ORDER BY added_date''')
-    products = c.fetchall()
-    conn.close()
-    return products
+    return _storage.get_available_products()
 
 def get_product_by_id(product_id):
     """Specific product details"""
-    conn = sqlite3.connect('bot_database.db')
-    c = conn.cursor()
-    c.execute('''SELECT * FROM products WHERE id = ?''', (product_id,))
-    product = c.fetchone()
-    conn.close()
-    return product
+    return _storage.get_product_by_id(product_id)
 
 def mark_product_sold(product_id):
-    """Product sold mark karta hai"""
-    conn = sqlite3.connect('bot_database.db')
-    c = conn.cursor()
-    c.execute('''UPDATE products SET sold = 1 WHERE id = ?''', (product_id,))
-    conn.commit()
-    conn.close()
-
-def create_order(order_id, user_id, username, product_id, product_data, amount):
+    """Product sold mark karta hai - pehle se sold tha toh False"""
+    return _storage.mark_product_sold(product_id)
+
+def create_order(order_id, user_id, username, product_id, product_data, amount, order_date=None):
     """New order create karta hai"""
-    conn = sqlite3.connect('bot_database.db')
-    c = conn.cursor()
-    
-    c.execute('''INSERT INTO orders 
-                 (order_id, user_id, username, product_id, product_data, amount) 
-                 VALUES (?, ?, ?, ?, ?, ?)''', 
-              (order_id, user_id, username, product_id, product_data, amount))
+    order = _storage.create_order(order_id, user_id, username, product_id, product_data, amount, order_date)
     
-    c.execute('''INSERT OR IGNORE INTO users (user_id, username) 
-                 VALUES (?, ?)''', (user_id, username))
-    
-    conn.commit()
-    conn.close()
+    # Naya order hi user ka latest active order hai
+    _cache_active_order(user_id, order)
 
 def update_order_screenshot(order_id, screenshot_id):
-    """Order mein screenshot update karta hai"""
-    conn = sqlite3.connect('bot_database.db')
-    c = conn.cursor()
-    c.execute('''UPDATE orders SET screenshot_id = ?, status = 'waiting_approval' 
-                 WHERE order_id = ?''', (screenshot_id, order_id))
-    conn.commit()
-    conn.close()
+    """Order mein screenshot update karta hai - order pending nahi tha toh False"""
+    order = _storage.update_order_screenshot(order_id, screenshot_id)
+    if order:
+        _refresh_active_order(order[1], order)
+    return order is not None
 
 def approve_order(order_id, admin_id):
-    """Order approve karta hai"""
-    conn = sqlite3.connect('bot_database.db')
-    c = conn.cursor()
-    
-    c.execute('''UPDATE orders SET status = 'approved', 
-                 admin_action_date = CURRENT_TIMESTAMP, admin_id = ? 
-                 WHERE order_id = ?''', (admin_id, order_id))
-    
-    result = c.execute('''SELECT product_id FROM orders WHERE order_id = ?''', (order_id,)).fetchone()
-    if result:
-        mark_product_sold(result[0])
-    
-    order = c.execute('''SELECT user_id, amount FROM orders WHERE order_id = ?''', (order_id,)).fetchone()
+    """Order approve karta hai - waiting_approval nahi tha ya product bik chuka toh None"""
+    order = _storage.approve_order(order_id, admin_id)
     if order:
-        user_id, amount = order
-        c.execute('''UPDATE users SET total_orders = total_orders + 1, 
-                     total_spent = total_spent + ? WHERE user_id = ?''', 
-                  (amount, user_id))
-    
-    conn.commit()
-    conn.close()
+        _invalidate_active_order(order[1])
+    return order
+
+def approve_orders(order_ids, admin_id):
+    """Kai orders ek transaction mein approve karta hai (sirf waiting_approval wale)"""
+    approved = _storage.approve_orders(order_ids, admin_id)
+    for order in approved:
+        _invalidate_active_order(order[1])
+    return approved
 
 def reject_order(order_id, admin_id):
-    """Order reject karta hai"""
-    conn = sqlite3.connect('bot_database.db')
-    c = conn.cursor()
-    c.execute('''UPDATE orders SET status = 'rejected', 
-                 admin_action_date = CURRENT_TIMESTAMP, admin_id = ? 
-                 WHERE order_id = ?''', (admin_id, order_id))
-    conn.commit()
-    conn.close()
+    """Order reject karta hai - pehle se approved / rejected / expired ho toh None"""
+    order = _storage.reject_order(order_id, admin_id)
+    if order:
+        _invalidate_active_order(order[1])
+    return order
+
+def expire_stale_orders(timeout_minutes, now=None):
+    """Timeout se purane pending (bina screenshot) orders expire karta hai"""
+    expired = _storage.expire_stale_orders(timeout_minutes, now)
+    for user_id in {user_id for _, user_id in expired}:
+        _invalidate_active_order(user_id)
+    return [order_id for order_id, _ in expired]
 
 def get_pending_orders():
     """Pending orders return karta hai"""
-    conn = sqlite3.connect('bot_database.db')
-    c = conn.cursor()
-    c.execute('''SELECT * FROM orders WHERE status = 'waiting_approval' 
-                 ORDER BY order_date''')
-    orders = c.fetchall()
-    conn.close()
-    return orders
+    return _storage.get_pending_orders()
 
 def get_order_by_user(user_id):
     """User ka last pending order"""
-    conn = sqlite3.connect('bot_database.db')
-    c = conn.cursor()
-    c.execute('''SELECT * FROM orders WHERE user_id = ? AND 
-                 (status = 'pending' OR status = 'waiting_approval') 
-                 ORDER BY order_date DESC LIMIT 1''', (user_id,))
-    order = c.fetchone()
-    conn.close()
+    with _active_orders_lock:
+        if user_id in _active_orders:
+            _active_orders.move_to_end(user_id)
+            metrics.incr('active_order_cache_hits')
+            return _active_orders[user_id]
+        version = _active_orders_version
+    metrics.incr('active_order_cache_misses')
+    
+    order = _storage.get_active_order(user_id)
+    
+    _cache_active_order(user_id, order, version)
     return order
 
 def get_order_by_id(order_id):
     """Order details by order_id"""
-    conn = sqlite3.connect('bot_database.db')
-    c = conn.cursor()
-    c.execute('''SELECT * FROM orders WHERE order_id = ?''', (order_id,))
-    order = c.fetchone()
-    conn.close()
-    return order
+    return _storage.get_order_by_id(order_id)
 
 def get_user_orders(user_id, limit=10):
     """User ke orders"""
-    conn = sqlite3.connect('bot_database.db')
-    c = conn.cursor()
-    c.execute('''SELECT * FROM orders WHERE user_id = ? 
-                 ORDER BY order_date DESC LIMIT ?''', (user_id, limit))
-    orders = c.fetchall()
-    conn.close()
-    return orders
+    return _storage.get_user_orders(user_id, limit)
 
 def get_stats():
     """Bot statistics"""
-    conn = sqlite3.connect('bot_database.db')
-    c = conn.cursor()
-    
-    stats = {}
-    c.execute('''SELECT COUNT(*) FROM products''')
-    stats['total_products'] = c.fetchone()[0]
-    
-    c.execute('''SELECT COUNT(*) FROM products WHERE sold = 0''')
-    stats['available_products'] = c.fetchone()[0]
-    
-    c.execute('''SELECT COUNT(*) FROM products WHERE sold = 1''')
-    stats['sold_products'] = c.fetchone()[0]
-    
-    c.execute('''SELECT COUNT(*) FROM orders''')
-    stats['total_orders'] = c.fetchone()[0]
-    
-    c.execute('''SELECT COUNT(*) FROM orders WHERE status = 'approved' ''')
-    stats['approved_orders'] = c.fetchone()[0]
-    
-    c.execute('''SELECT COUNT(*) FROM orders WHERE status = 'waiting_approval' ''')
-    stats['pending_orders'] = c.fetchone()[0]
-    
-    c.execute('''SELECT SUM(amount) FROM orders WHERE status = 'approved' ''')
-    stats['total_revenue'] = c.fetchone()[0] or 0
-    
-    c.execute('''SELECT COUNT(*) FROM users''')
-    stats['total_users'] = c.fetchone()[0]
-    
-    conn.close()
-    return stats
+    return _storage.get_stats()
 
 def get_all_users():
     """All users list"""
-    conn = sqlite3.connect('bot_database.db')
-    c = conn.cursor()
-    c.execute('''SELECT * FROM users ORDER BY join_date DESC''')
-    users = c.fetchall()
-    conn.close()
-    return users
\ No newline at end of file
+    return _storage.get_all_users()
+
+def get_user_count():
+    """Total users count"""
+    return _storage.get_user_count()
+
+def get_top_users(limit=10):
+    """Sabse zyada spend karne wale users (indexed)"""
+    return _storage.get_top_users(limit)
+
+def get_recent_users(limit=10):
+    """Recently join hue users (indexed)"""
+    return _storage.get_recent_users(limit)
+
+def iter_users(chunk_size=500):
+    """Saare users chunks mein yield karta hai - memory flat rehti hai"""
+    return _storage.iter_users(chunk_size)
+
+def add_screenshot_hash(order_id, user_id, hash_value):
+    """Screenshot ka perceptual hash save karta hai"""
+    _storage.add_screenshot_hash(order_id, user_id, hash_value)
+
+def iter_screenshot_hashes(chunk_size=5000):
+    """Saved hashes (order_id, user_id, hash) chunks mein yield karta hai"""
+    return _storage.iter_screenshot_hashes(chunk_size)
+
+def get_categories():
+    """Saari product categories"""
+    return _storage.get_categories()
+
+def add_restock_subscription(user_id, category):
+    """User ko category restock par notify karne ke liye subscribe karta hai"""
+    return _storage.add_restock_subscription(user_id, category)
+
+def get_restock_subscribers(category, after_user_id=0, limit=500):
+    """Category ke agle chunk ke subscribers (indexed keyset query)"""
+    return _storage.get_restock_subscribers(category, after_user_id, limit)
+
+def remove_restock_subscriptions(category, user_ids):
+    """Notify ho chuke subscribers hata deta hai"""
+    _storage.remove_restock_subscriptions(category, user_ids)
+
+def claim_next_order(reviewer_id, lease_seconds):
+    """Review queue se agla order reviewer ko lease par deta hai"""
+    return _storage.claim_next_order(reviewer_id, lease_seconds)
+
+def claim_order(order_id, reviewer_id, lease_seconds):
+    """Order reviewer ke naam lock karta hai - dusre ke lease mein ho toh False"""
+    return _storage.claim_order(order_id, reviewer_id, lease_seconds)
+
+def get_review_queue():
+    """Queue mein kitne orders aur sabse purana kitni der se wait kar raha hai"""
+    return _storage.get_review_queue()
+
+def get_reviewer_stats():
+    """Per reviewer completed orders aur average wait / handling time"""
+    stats = []
+    for reviewer_id, completed, total_wait, total_handle in _storage.get_reviewer_stats():
+        stats.append({
+            'reviewer_id': reviewer_id,
+            'completed': completed,
+            'avg_wait_seconds': (total_wait or 0) / completed if completed else 0,
+            'avg_handle_seconds': (total_handle or 0) / completed if completed else 0,
+        })
+    return sorted(stats, key=lambda r: r['completed'], reverse=True)
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+import config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Update journal - har update ka status, taaki restart par kuch chhoote nahi
+# aur dobara aaye updates do baar process na hon.
+#   received  - fetch hokar update_queue mein aaya, Telegram ko offset confirm
+#               hone se pehle (crash hua toh agle start par replay hoga)
+#   deferred  - drain ke time aaya, process nahi hua (agle start par replay)
+#   done      - process ho gaya (dobara aaye toh skip)
+
+# Har update par naya connection ~0.5ms leta tha - ek hi connection reuse hota
+# hai (writes asyncio.to_thread se aate hain, isliye lock ke saath)
+_conn = None
+_lock = threading.Lock()
+
+# put ke time jo updates pehle hi done nikle, aur is process mein handle hue
+# updates (replay + Telegram redelivery dono queue mein ho sakte hain) -
+# processor inhe bina SELECT skip karta hai
+RECENT_HANDLED_LIMIT = 10000
+_done_on_arrival = set()
+_recent_handled = OrderedDict()
+
+def _connection():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(config.RUNTIME_DB_PATH, check_same_thread=False)
+        _conn.execute('PRAGMA synchronous = NORMAL')
+    return _conn
+
+def init_journal():
+    """Update journal table create karta hai"""
+    close_journal()
+    with _lock:
+        _create_table(_connection())
+
+def close_journal():
+    """Shared connection band karta hai (shutdown par)"""
+    global _conn
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+
+def _create_table(conn):
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('''CREATE TABLE IF NOT EXISTS update_journal
+                    (update_id INTEGER PRIMARY KEY,
+                     payload TEXT NOT NULL,
+                     status TEXT NOT NULL,
+                     received_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+                     finished_date DATETIME)''')
+    conn.commit()
+
+def begin_update(update_id, payload, status='received'):
+    """Update journal mein likhta hai - pehle hi done hai toh False (ek hi statement)"""
+    with _lock:
+        conn = _connection()
+        c = conn.execute('''INSERT INTO update_journal (update_id, payload, status) VALUES (?, ?, ?)
+                            ON CONFLICT(update_id) DO UPDATE SET payload = excluded.payload,
+                            status = excluded.status, received_date = CURRENT_TIMESTAMP
+                            WHERE update_journal.status != 'done' ''', (update_id, payload, status))
+        conn.commit()
+        return c.rowcount == 1
+
+def finish_update(update_id):
+    """Update processed mark karta hai"""
+    with _lock:
+        conn = _connection()
+        conn.execute('''UPDATE update_journal SET status = 'done', finished_date = CURRENT_TIMESTAMP 
+                        WHERE update_id = ?''', (update_id,))
+        conn.commit()
+
+def get_unfinished_updates():
+    """Pichle process ke adhoore / deferred updates (update_id order mein)"""
+    with _lock:
+        return _connection().execute('''SELECT update_id, payload, status FROM update_journal 
+                                        WHERE status != 'done' ORDER BY update_id''').fetchall()
+
+def prune_journal(keep_hours=48):
+    """Purane done updates hata deta hai (Telegram 24h tak hi redeliver karta hai)"""
+    with _lock:
+        conn = _connection()
+        c = conn.execute('''DELETE FROM update_journal WHERE status = 'done' 
+                            AND finished_date < datetime('now', ?)''', (f'-{int(keep_hours)} hours',))
+        conn.commit()
+        return c.rowcount
+
+class JournalingUpdateQueue(asyncio.Queue):
+    """update_queue jo har update ko queue mein daalne se pehle journal karta hai.
+
+    Updater offset (Telegram ka ack) agle getUpdates par bhejta hai, jo put ke
+    baad hota hai - isliye slow handler ke peeche queue mein pade updates bhi
+    crash par replay ho jaate hain. Write thread mein hota hai, event loop
+    (aur flood_guard) block nahi hota.
+    """
+
+    async def put(self, item):
+        if isinstance(item, Update):
+            payload = json.dumps(item.to_dict())
+            if not await asyncio.to_thread(begin_update, item.update_id, payload):
+                _done_on_arrival.add(item.update_id)
+        await super().put(item)
+
+class JournalingUpdateProcessor(BaseUpdateProcessor):
+    """Updates ek ek karke process karta hai, journal ke saath.
+
+    Drain mode mein naye updates process nahi hote - unhe journal mein
+    'deferred' likh dete hain aur agla process unhe replay karta hai.
+    """
+
+    def __init__(self):
+        super().__init__(1)
+        self.draining = False
+        self._in_flight = set()
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_process_update(self, update, coroutine):
+        if not isinstance(update, Update):
+            await coroutine
+            return
+
+        if self.draining:
+            _done_on_arrival.discard(update.update_id)
+            coroutine.close()
+            await asyncio.to_thread(begin_update, update.update_id, json.dumps(update.to_dict()), 'deferred')
+            metrics.incr('updates_deferred')
+            return
+
+        if update.update_id in _done_on_arrival or update.update_id in _recent_handled:
+            _done_on_arrival.discard(update.update_id)
+            coroutine.close()
+            metrics.incr('updates_duplicate_skipped')
+            logger.info(f"⏭️ Skipping already processed update {update.update_id}")
+            return
+
+        task = asyncio.current_task()
+        self._in_flight.add(task)
+        try:
+            await coroutine
+        except asyncio.CancelledError:
+            # Handler beech mein cancel hua (drain deadline) - 'received' hi rehne do,
+            # agle start par replay hoga
+            raise
+        except Exception:
+            await self._finish(update.update_id)
+            raise
+        finally:
+            self._in_flight.discard(task)
+        await self._finish(update.update_id)
+
+    async def cancel_in_flight(self):
+        """Drain deadline par chal rahe handlers cancel - bot ka HTTP client band hone se pehle,
+        taaki handler network error ke saath 'done' na ho jaye balki replay ho"""
+        tasks = list(self._in_flight)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _finish(self, update_id):
+        _recent_handled[update_id] = True
+        if len(_recent_handled) > RECENT_HANDLED_LIMIT:
+            _recent_handled.popitem(last=False)
+        await asyncio.to_thread(finish_update, update_id)
@@ -0,0 +1,15 @@
+from collections import Counter
+
+_counters = Counter()
+
+def incr(name, amount=1):
+    """Counter badhata hai"""
+    _counters[name] += amount
+
+def get(name):
+    """Ek counter ki value"""
+    return _counters[name]
+
+def snapshot():
+    """Saare counters ki copy"""
+    return dict(_counters)
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import sqlite3
+import time
+
+from telegram.error import BadRequest, ChatMigrated, Forbidden, NetworkError, RetryAfter, TelegramError
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Zaroori outbound messages (deliveries, reviewer notifications) pehle DB mein,
+# phir worker bhejta hai - bot stop / crash hone par bhi message khota nahi.
+OUTBOX_BATCH_SIZE = 25             # Telegram ~30 messages/sec limit ke neeche
+OUTBOX_BATCH_INTERVAL_SECONDS = 1
+OUTBOX_IDLE_POLL_SECONDS = 1
+OUTBOX_ERROR_BACKOFF_SECONDS = 5
+
+_wakeup = None
+
+def _connect():
+    conn = sqlite3.connect(config.RUNTIME_DB_PATH)
+    conn.execute('PRAGMA synchronous = NORMAL')
+    return conn
+
+def _wake_worker():
+    if _wakeup is not None:
+        _wakeup.set()
+
+def init_outbox():
+    """Outbox table create karta hai"""
+    conn = _connect()
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('''CREATE TABLE IF NOT EXISTS outbox
+                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                     chat_id INTEGER NOT NULL,
+                     text TEXT NOT NULL,
+                     parse_mode TEXT,
+                     created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+                     sent_date DATETIME,
+                     error TEXT)''')
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_outbox_unsent 
+                    ON outbox (id) WHERE sent_date IS NULL''')
+    conn.commit()
+    conn.close()
+
+def enqueue_message(chat_id, text, parse_mode='Markdown'):
+    """Message outbox mein daalta hai"""
+    enqueue_messages([(chat_id, text, parse_mode)])
+
+def enqueue_messages(messages):
+    """Kai (chat_id, text, parse_mode) ek transaction mein outbox mein"""
+    conn = _connect()
+    conn.executemany('''INSERT INTO outbox (chat_id, text, parse_mode) VALUES (?, ?, ?)''', messages)
+    conn.commit()
+    conn.close()
+    _wake_worker()
+
+def get_unsent_messages(limit=OUTBOX_BATCH_SIZE):
+    """Sabse purane unsent messages"""
+    conn = _connect()
+    c = conn.cursor()
+    c.execute('''SELECT id, chat_id, text, parse_mode FROM outbox 
+                 WHERE sent_date IS NULL ORDER BY id LIMIT ?''', (limit,))
+    rows = c.fetchall()
+    conn.close()
+    return rows
+
+def count_unsent_messages():
+    conn = _connect()
+    count = conn.execute('''SELECT COUNT(*) FROM outbox WHERE sent_date IS NULL''').fetchone()[0]
+    conn.close()
+    return count
+
+def update_message_chat(message_id, chat_id):
+    """Group supergroup ban gaya - naye chat_id par bhejna hai"""
+    conn = _connect()
+    conn.execute('''UPDATE outbox SET chat_id = ? WHERE id = ?''', (chat_id, message_id))
+    conn.commit()
+    conn.close()
+
+def mark_message_done(message_id, error=None):
+    """Bhej diya (ya permanently fail) - dobara nahi bhejna"""
+    conn = _connect()
+    # Text hata dete hain - delivery messages mein credentials hote hain
+    conn.execute('''UPDATE outbox SET sent_date = CURRENT_TIMESTAMP, error = ?, text = '' WHERE id = ?''',
+                 (error, message_id))
+    conn.commit()
+    conn.close()
+
+def prune_outbox(keep_hours=48):
+    """Purane sent messages hata deta hai (aur pehle ke sent rows ka text bhi saaf)"""
+    conn = _connect()
+    c = conn.cursor()
+    c.execute('''DELETE FROM outbox WHERE sent_date IS NOT NULL 
+                 AND sent_date < datetime('now', ?)''', (f'-{int(keep_hours)} hours',))
+    deleted = c.rowcount
+    c.execute('''UPDATE outbox SET text = '' WHERE sent_date IS NOT NULL AND text != '' ''')
+    conn.commit()
+    conn.close()
+    return deleted
+
+async def _send(bot, chat_id, text, parse_mode):
+    try:
+        await bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+    except BadRequest:
+        if not parse_mode:
+            raise
+        # Markdown parse error (jaise username mein '_') - plain text mein bhejo
+        await bot.send_message(chat_id=chat_id, text=text)
+
+async def _send_batch(bot, batch):
+    for message_id, chat_id, text, parse_mode in batch:
+        try:
+            await _send(bot, chat_id, text, parse_mode)
+            mark_message_done(message_id)
+        except RetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+            return
+        except ChatMigrated as e:
+            # Message outbox mein rehta hai, agle batch mein naye chat par jayega
+            update_message_chat(message_id, e.new_chat_id)
+        except (Forbidden, BadRequest) as e:
+            # Permanent error (user ne block kiya, galat chat) - retry ka fayda nahi
+            logger.error(f"Outbox message {message_id} to {chat_id} failed: {e}")
+            mark_message_done(message_id, str(e))
+        except NetworkError as e:
+            # Temporary - message outbox mein rehta hai, thodi der baad retry
+            logger.warning(f"Outbox send to {chat_id} failed, will retry: {e}")
+            await asyncio.sleep(OUTBOX_IDLE_POLL_SECONDS)
+            return
+        except TelegramError as e:
+            logger.error(f"Outbox message {message_id} to {chat_id} failed: {e}")
+            mark_message_done(message_id, str(e))
+
+async def run_outbox_worker(bot, stopping):
+    """Outbox messages rate limit ke andar bhejta hai; stopping set hone par khali karke rukta hai"""
+    global _wakeup
+    _wakeup = asyncio.Event()
+
+    while True:
+        try:
+            batch = get_unsent_messages()
+            if not batch:
+                if stopping.is_set():
+                    return
+                _wakeup.clear()
+                try:
+                    await asyncio.wait_for(_wakeup.wait(), OUTBOX_IDLE_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            batch_started = time.monotonic()
+            await _send_batch(bot, batch)
+        except Exception as e:
+            # Worker kabhi band nahi hona chahiye (DB locked etc.) - wait karke dobara
+            logger.exception(f"Outbox worker error, retrying: {e}")
+            await asyncio.sleep(OUTBOX_ERROR_BACKOFF_SECONDS)
+            continue
+
+        remaining = OUTBOX_BATCH_INTERVAL_SECONDS - (time.monotonic() - batch_started)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
@@ -0,0 +1,73 @@
+import io
+
+HASH_SIZE = 8
+
+def dhash(image_bytes, hash_size=HASH_SIZE):
+    """Screenshot ka difference hash (64-bit int) return karta hai"""
+    # Pillow sirf worker process mein chahiye - bot startup par import nahi
+    from PIL import Image
+
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        small = img.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+        pixels = list(small.getdata())
+
+    value = 0
+    width = hash_size + 1
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * width + col]
+            right = pixels[row * width + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+class HashIndex:
+    """Multi-index hash lookup for near-duplicate hashes.
+
+    Hash ko (max_distance // 2 + 1) chunks mein todte hain. Agar do hashes ka
+    distance max_distance ya kam hai, toh pigeonhole se kam se kam ek chunk
+    mein sirf 0 ya 1 bit ka fark hoga - isliye har chunk ke liye sirf uska
+    exact bucket aur 1-bit neighbours check karne padte hain, poora index nahi.
+    """
+
+    def __init__(self, max_distance=5, bits=HASH_SIZE * HASH_SIZE):
+        self.max_distance = max_distance
+        chunks = max_distance // 2 + 1
+
+        # (shift, width) per chunk, bits jitna ho sake barabar baante
+        self._chunks = []
+        shift = 0
+        for i in range(chunks):
+            width = bits // chunks + (1 if i < bits % chunks else 0)
+            self._chunks.append((shift, width))
+            shift += width
+
+        self._tables = [{} for _ in range(chunks)]
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, hash_value, key):
+        """Hash ko index mein add karta hai"""
+        entry = (hash_value, key)
+        for (shift, width), table in zip(self._chunks, self._tables):
+            chunk = (hash_value >> shift) & ((1 << width) - 1)
+            table.setdefault(chunk, []).append(entry)
+        self._size += 1
+
+    def find(self, hash_value, max_distance=None):
+        """max_distance ke andar wale (distance, key) return karta hai, nearest pehle"""
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+
+        matches = {}
+        for (shift, width), table in zip(self._chunks, self._tables):
+            chunk = (hash_value >> shift) & ((1 << width) - 1)
+            probes = [chunk] + [chunk ^ (1 << bit) for bit in range(width)]
+            for probe in probes:
+                for candidate, key in table.get(probe, ()):
+                    distance = (candidate ^ hash_value).bit_count()
+                    if distance <= max_distance:
+                        matches[key] = distance
+
+        return sorted((distance, key) for key, distance in matches.items())
@@ -0,0 +1,49 @@
+import time
+from collections import OrderedDict
+
+class TokenBucketLimiter:
+    """Per-user token buckets, bounded with LRU eviction.
+
+    Har user ke liye sirf ek chhoti list [tokens, last_update, warned] rakhte
+    hain. max_users se zyada users hone par sabse purana (least recently seen)
+    bucket hata dete hain - wapas aane par woh full bucket se start karega.
+    """
+
+    def __init__(self, rate, capacity, max_users=50000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_users = max_users
+        self._buckets = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def allow(self, user_id, cost=1, now=None):
+        """Token available ho toh consume karke True, warna False"""
+        if now is None:
+            now = time.monotonic()
+
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = [self.capacity, now, False]
+            self._buckets[user_id] = bucket
+            if len(self._buckets) > self.max_users:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(user_id)
+            bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            bucket[2] = False
+            return True
+        return False
+
+    def warn_once(self, user_id):
+        """Throttle hone par user ko sirf ek baar batane ke liye"""
+        bucket = self._buckets.get(user_id)
+        if bucket is None or bucket[2]:
+            return False
+        bucket[2] = True
+        return True
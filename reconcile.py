@@ -0,0 +1,127 @@
+import csv
+import re
+from decimal import Decimal, InvalidOperation
+
+# generate_order_id() format: ORD + YYYYmmddHHMMSS + 4 chars
+ORDER_ID_PATTERN = re.compile(r'ORD\d{14}[A-Z0-9]{4}')
+
+# Bank / UPI exports mein amount column ke common naam (priority order)
+AMOUNT_HEADERS = (
+    'credit', 'credit amount', 'credit amt', 'deposit', 'deposit amount', 'deposit amt',
+    'cr', 'amount', 'amount (inr)', 'txn amount', 'transaction amount',
+)
+
+# Alag debit / withdrawal column, aur Dr/Cr type column ke naam
+DEBIT_HEADERS = ('debit', 'debit amount', 'debit amt', 'withdrawal', 'withdrawal amount', 'withdrawal amt', 'dr')
+TYPE_HEADERS = ('type', 'cr/dr', 'dr/cr', 'txn type', 'transaction type')
+
+# 'Rs.' / 'INR' / '₹' - inka '.' amount ka decimal point nahi hai
+CURRENCY_PREFIX = re.compile(r'(?i)₹|\binr\b|\brs\b\.?')
+DEBIT_MARK = re.compile(r'(?i)\b(dr|debit)\b')
+
+REPORT_HEADER = ['row', 'status', 'reason', 'order_id', 'paid', 'expected']
+
+def parse_amount(value):
+    """'₹1,250.00 CR' / 'Rs. 50' jaise text se Decimal amount nikalta hai"""
+    cleaned = re.sub(r'[^\d.\-]', '', CURRENCY_PREFIX.sub('', value or ''))
+    if not cleaned:
+        return None
+    try:
+        return Decimal(cleaned)
+    except InvalidOperation:
+        return None
+
+def find_column(header, names):
+    """names (priority order) mein se pehla jo header mein ho uska index, warna None"""
+    normalized = [h.strip().lower() for h in header]
+    for name in names:
+        if name in normalized:
+            return normalized.index(name)
+    return None
+
+def find_amount_column(header):
+    """Header row mein amount column ka index"""
+    col = find_column(header, AMOUNT_HEADERS)
+    if col is None:
+        raise ValueError(f"Amount column not found in statement header: {header}")
+    return col
+
+def is_debit(row, amount_col, debit_col=None, type_col=None):
+    """Debit / refund row - payment nahi, isse order approve nahi hona chahiye"""
+    def cell(col):
+        return row[col] if col is not None and col < len(row) else ''
+
+    if DEBIT_MARK.search(cell(amount_col)) or DEBIT_MARK.search(cell(type_col)):
+        return True
+    if debit_col is not None and debit_col != amount_col and parse_amount(cell(debit_col)):
+        return True
+    paid = parse_amount(cell(amount_col))
+    return paid is not None and paid < 0
+
+def reconcile_statement(lines, pending_orders):
+    """Statement rows ko waiting_approval orders se match karta hai.
+
+    lines koi bhi text line iterable ho sakta hai (open file, streamed) -
+    rows ek ek karke padhe jaate hain. pending_orders get_pending_orders()
+    ke rows hain; unse ek hi baar order_id -> amount index banta hai.
+    Debit / refund rows kabhi match nahi hote. 'not_approved' caller bharta
+    hai - matched orders jo approve ke waqt skip ho gaye.
+    """
+    expected = {order[0]: order[5] for order in pending_orders}
+
+    report = {'rows': 0, 'matched': [], 'mismatched': [], 'unmatched': [], 'not_approved': []}
+    seen = set()
+
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        raise ValueError("Statement is empty")
+    amount_col = find_amount_column(header)
+    debit_col = find_column(header, DEBIT_HEADERS)
+    type_col = find_column(header, TYPE_HEADERS)
+
+    for row_no, row in enumerate(reader, 2):
+        if not row:
+            continue
+        report['rows'] += 1
+
+        tokens = set(ORDER_ID_PATTERN.findall(' '.join(row)))
+        if not tokens:
+            report['unmatched'].append((row_no, 'no order id', None, None))
+            continue
+        if len(tokens) > 1:
+            report['unmatched'].append((row_no, 'multiple order ids', ' '.join(sorted(tokens)), None))
+            continue
+
+        order_id = tokens.pop()
+        if is_debit(row, amount_col, debit_col, type_col):
+            report['unmatched'].append((row_no, 'debit / refund row', order_id, None))
+            continue
+
+        paid = parse_amount(row[amount_col]) if amount_col < len(row) else None
+
+        if order_id not in expected:
+            report['unmatched'].append((row_no, 'order not waiting approval', order_id, paid))
+        elif order_id in seen:
+            report['unmatched'].append((row_no, 'duplicate payment row', order_id, paid))
+        elif paid is None:
+            report['unmatched'].append((row_no, 'amount missing', order_id, None))
+        elif paid != expected[order_id]:
+            report['mismatched'].append((row_no, order_id, paid, expected[order_id]))
+            seen.add(order_id)
+        else:
+            report['matched'].append((row_no, order_id, paid))
+            seen.add(order_id)
+
+    return report
+
+def write_report_csv(report, text_file):
+    """Mismatched aur unmatched rows report file mein likhta hai"""
+    writer = csv.writer(text_file)
+    writer.writerow(REPORT_HEADER)
+    for row_no, order_id, paid, expected in report['mismatched']:
+        writer.writerow([row_no, 'mismatched', 'amount differs', order_id, paid, expected])
+    for row_no, order_id, paid in report['not_approved']:
+        writer.writerow([row_no, 'not_approved', 'already handled / product sold', order_id, paid, ''])
+    for row_no, reason, order_id, paid in report['unmatched']:
+        writer.writerow([row_no, 'unmatched', reason, order_id or '', '' if paid is None else paid, ''])
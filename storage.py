@@ -0,0 +1,1178 @@
+import heapq
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+# Row layouts (sab engines same tuples return karte hain):
+#   products: (id, product_data, category, price, sold, added_date)
+#   orders:   (order_id, user_id, username, product_id, product_data, amount,
+#              screenshot_id, status, order_date, admin_action_date, admin_id)
+#   users:    (user_id, username, first_name, join_date, total_orders, total_spent)
+
+# SQLite schema version (PRAGMA user_version) - tables/indexes badlo toh badhao
+SCHEMA_VERSION = 2
+
+STATS_KEYS = ('total_products', 'available_products', 'sold_products', 'total_orders',
+              'approved_orders', 'pending_orders', 'total_revenue', 'total_users')
+
+class Storage:
+    """Storage interface - database.py ke saare operations.
+
+    Order badalne wale methods (create / screenshot / approve / reject)
+    updated order row return karte hain, taaki database.py ka active order
+    cache kisi bhi engine ke saath write-through reh sake.
+
+    Status transitions guarded hain - galat state se transition par kuch
+    nahi badalta aur None milta hai:
+      pending -> waiting_approval (screenshot) -> approved / rejected
+      pending -> rejected / expired
+    Approve sirf tab hota hai jab product abhi unsold ho (double sell nahi).
+    """
+
+    def init_database(self):
+        """Schema banata hai - naya bana / upgrade hua toh True"""
+        raise NotImplementedError
+
+    def add_product(self, product_data, category="General", price=50):
+        raise NotImplementedError
+
+    def get_available_products(self):
+        raise NotImplementedError
+
+    def get_product_by_id(self, product_id):
+        raise NotImplementedError
+
+    def mark_product_sold(self, product_id):
+        """Unsold product sold mark karta hai - pehle se sold tha toh False"""
+        raise NotImplementedError
+
+    def create_order(self, order_id, user_id, username, product_id, product_data, amount, order_date=None):
+        """order_date None = abhi (UTC); stress harness logical clock deta hai"""
+        raise NotImplementedError
+
+    def update_order_screenshot(self, order_id, screenshot_id):
+        raise NotImplementedError
+
+    def approve_order(self, order_id, admin_id):
+        raise NotImplementedError
+
+    def reject_order(self, order_id, admin_id):
+        raise NotImplementedError
+
+    def approve_orders(self, order_ids, admin_id):
+        """Kai waiting_approval orders ek transaction mein approve - approved rows return"""
+        raise NotImplementedError
+
+    def expire_stale_orders(self, timeout_minutes, now=None):
+        """Expire hue (order_id, user_id) list return karta hai (now None = abhi)"""
+        raise NotImplementedError
+
+    def get_pending_orders(self):
+        raise NotImplementedError
+
+    def get_active_order(self, user_id):
+        """User ka latest pending / waiting_approval order (bina cache)"""
+        raise NotImplementedError
+
+    def get_order_by_id(self, order_id):
+        raise NotImplementedError
+
+    def get_user_orders(self, user_id, limit=10):
+        raise NotImplementedError
+
+    def get_stats(self):
+        raise NotImplementedError
+
+    def get_all_users(self):
+        raise NotImplementedError
+
+    def get_user_count(self):
+        raise NotImplementedError
+
+    def get_top_users(self, limit=10):
+        raise NotImplementedError
+
+    def get_recent_users(self, limit=10):
+        raise NotImplementedError
+
+    def iter_users(self, chunk_size=500):
+        raise NotImplementedError
+
+    def add_screenshot_hash(self, order_id, user_id, hash_value):
+        raise NotImplementedError
+
+    def iter_screenshot_hashes(self, chunk_size=5000):
+        raise NotImplementedError
+
+    def get_categories(self):
+        """Saari product categories (sold out wali bhi)"""
+        raise NotImplementedError
+
+    def add_restock_subscription(self, user_id, category):
+        """Naya subscription ho toh True"""
+        raise NotImplementedError
+
+    def get_restock_subscribers(self, category, after_user_id=0, limit=500):
+        """after_user_id ke baad wale subscriber user_ids (keyset pagination)"""
+        raise NotImplementedError
+
+    def remove_restock_subscriptions(self, category, user_ids):
+        raise NotImplementedError
+
+    def claim_next_order(self, reviewer_id, lease_seconds):
+        """Queue ka agla order reviewer ko lease par deta hai (order row ya None)"""
+        raise NotImplementedError
+
+    def claim_order(self, order_id, reviewer_id, lease_seconds):
+        """Specific order claim / lease renew karta hai - dusre ke paas ho toh False"""
+        raise NotImplementedError
+
+    def get_review_queue(self):
+        """{'waiting': n, 'oldest_wait_seconds': s}"""
+        raise NotImplementedError
+
+    def get_reviewer_stats(self):
+        """[(reviewer_id, completed, total_wait_seconds, total_handle_seconds)]"""
+        raise NotImplementedError
+
+# ====================
+# SQLITE
+# ====================
+class SQLiteStorage(Storage):
+    """Ek SQLite file - har call apna connection kholta hai"""
+
+    def __init__(self, path='bot_database.db'):
+        self.path = path
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+    def init_database(self):
+        conn = self._connect()
+        c = conn.cursor()
+
+        # Schema pehle se current hai - har restart par saare CREATE statements skip
+        if c.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION:
+            conn.close()
+            return False
+
+        # Products table
+        c.execute('''CREATE TABLE IF NOT EXISTS products
+                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                      product_data TEXT UNIQUE NOT NULL,
+                      category TEXT,
+                      price INTEGER DEFAULT 50,
+                      sold INTEGER DEFAULT 0,
+                      added_date DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+
+        # Orders table
+        c.execute('''CREATE TABLE IF NOT EXISTS orders
+                     (order_id TEXT PRIMARY KEY,
+                      user_id INTEGER NOT NULL,
+                      username TEXT,
+                      product_id INTEGER,
+                      product_data TEXT,
+                      amount INTEGER,
+                      screenshot_id TEXT,
+                      status TEXT DEFAULT 'pending',
+                      order_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+                      admin_action_date DATETIME,
+                      admin_id INTEGER)''')
+
+        # Users table
+        c.execute('''CREATE TABLE IF NOT EXISTS users
+                     (user_id INTEGER PRIMARY KEY,
+                      username TEXT,
+                      first_name TEXT,
+                      join_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+                      total_orders INTEGER DEFAULT 0,
+                      total_spent INTEGER DEFAULT 0)''')
+
+        # Payment screenshot hashes (duplicate detection)
+        c.execute('''CREATE TABLE IF NOT EXISTS screenshot_hashes
+                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                      order_id TEXT NOT NULL,
+                      user_id INTEGER NOT NULL,
+                      hash TEXT NOT NULL,
+                      added_date DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+
+        # Review queue - screenshot wale orders aur reviewer leases
+        c.execute('''CREATE TABLE IF NOT EXISTS order_reviews
+                     (order_id TEXT PRIMARY KEY,
+                      submitted_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+                      reviewer_id INTEGER,
+                      claimed_date DATETIME,
+                      lease_expires DATETIME,
+                      completed_date DATETIME)''')
+        c.execute('''CREATE INDEX IF NOT EXISTS idx_order_reviews_queue
+                     ON order_reviews (submitted_date) WHERE completed_date IS NULL''')
+        # Upgrade se pehle ke waiting orders bhi queue mein (warna claim nahi ho paate)
+        c.execute('''INSERT OR IGNORE INTO order_reviews (order_id, submitted_date)
+                     SELECT order_id, order_date FROM orders WHERE status = 'waiting_approval' ''')
+
+        # Restock subscriptions - PK (category, user_id) se category ke subscribers index se milte hain
+        c.execute('''CREATE TABLE IF NOT EXISTS restock_subscriptions
+                     (category TEXT NOT NULL,
+                      user_id INTEGER NOT NULL,
+                      created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+                      PRIMARY KEY (category, user_id)) WITHOUT ROWID''')
+
+        # Category list (/buy restock buttons) - get_categories iske upar skip-scan karta hai
+        c.execute('''CREATE INDEX IF NOT EXISTS idx_products_category
+                     ON products (category)''')
+
+        # Index for a user's latest active order
+        c.execute('''CREATE INDEX IF NOT EXISTS idx_orders_user_status
+                     ON orders (user_id, status, order_date)''')
+
+        # Indexes for admin user lists (top spenders / recent joins)
+        c.execute('''CREATE INDEX IF NOT EXISTS idx_users_total_spent
+                     ON users (total_spent DESC)''')
+        c.execute('''CREATE INDEX IF NOT EXISTS idx_users_join_date
+                     ON users (join_date DESC)''')
+
+        c.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        conn.commit()
+        conn.close()
+        return True
+
+    def add_product(self, product_data, category="General", price=50):
+        conn = self._connect()
+        c = conn.cursor()
+        try:
+            c.execute('''INSERT INTO products (product_data, category, price)
+                         VALUES (?, ?, ?)''', (product_data, category, price))
+            conn.commit()
+            return c.lastrowid
+        except sqlite3.IntegrityError:
+            return None
+        finally:
+            conn.close()
+
+    def get_available_products(self):
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''SELECT id, product_data, category, price
+                     FROM products WHERE sold = 0 ORDER BY added_date, id''')
+        products = c.fetchall()
+        conn.close()
+        return products
+
+    def get_product_by_id(self, product_id):
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''SELECT * FROM products WHERE id = ?''', (product_id,))
+        product = c.fetchone()
+        conn.close()
+        return product
+
+    def mark_product_sold(self, product_id):
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''UPDATE products SET sold = 1 WHERE id = ? AND sold = 0''', (product_id,))
+        sold = c.rowcount > 0
+        conn.commit()
+        conn.close()
+        return sold
+
+    def release_product(self, product_id):
+        """Sold product wapas available karta hai (sharded approve fail hone par)"""
+        conn = self._connect()
+        conn.execute('''UPDATE products SET sold = 0 WHERE id = ?''', (product_id,))
+        conn.commit()
+        conn.close()
+
+    def create_order(self, order_id, user_id, username, product_id, product_data, amount, order_date=None):
+        conn = self._connect()
+        c = conn.cursor()
+
+        c.execute('''INSERT INTO orders
+                     (order_id, user_id, username, product_id, product_data, amount, order_date)
+                     VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))''',
+                  (order_id, user_id, username, product_id, product_data, amount, order_date))
+
+        c.execute('''INSERT OR IGNORE INTO users (user_id, username)
+                     VALUES (?, ?)''', (user_id, username))
+
+        order = c.execute('''SELECT * FROM orders WHERE order_id = ?''', (order_id,)).fetchone()
+
+        conn.commit()
+        conn.close()
+        return order
+
+    def update_order_screenshot(self, order_id, screenshot_id):
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''UPDATE orders SET screenshot_id = ?, status = 'waiting_approval'
+                     WHERE order_id = ? AND status = 'pending' ''', (screenshot_id, order_id))
+        order = None
+        if c.rowcount:
+            c.execute('''INSERT OR REPLACE INTO order_reviews (order_id) VALUES (?)''', (order_id,))
+            order = c.execute('''SELECT * FROM orders WHERE order_id = ?''', (order_id,)).fetchone()
+        conn.commit()
+        conn.close()
+        return order
+
+    def _approve(self, c, order_id, admin_id, sell_product=True):
+        """waiting_approval order approve karta hai (caller ke transaction mein) - na ho sake toh None"""
+        if sell_product:
+            # Pehla statement write hai, isliye writer lock shuru mein hi milta hai
+            c.execute('''UPDATE products SET sold = 1 WHERE sold = 0 AND id =
+                         (SELECT product_id FROM orders WHERE order_id = ? AND status = 'waiting_approval')''',
+                      (order_id,))
+            if not c.rowcount:
+                return None
+
+        c.execute('''UPDATE orders SET status = 'approved',
+                     admin_action_date = CURRENT_TIMESTAMP, admin_id = ?
+                     WHERE order_id = ? AND status = 'waiting_approval' ''', (admin_id, order_id))
+        if not c.rowcount:
+            return None
+
+        order = c.execute('''SELECT * FROM orders WHERE order_id = ?''', (order_id,)).fetchone()
+        c.execute('''UPDATE users SET total_orders = total_orders + 1,
+                     total_spent = total_spent + ? WHERE user_id = ?''', (order[5], order[1]))
+        self._complete_review(c, order_id, admin_id)
+        return order
+
+    def approve_order(self, order_id, admin_id, sell_product=True):
+        conn = self._connect()
+        c = conn.cursor()
+        try:
+            order = self._approve(c, order_id, admin_id, sell_product)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return order
+
+    def approve_orders(self, order_ids, admin_id, sell_product=True):
+        conn = self._connect()
+        c = conn.cursor()
+        approved = []
+        try:
+            for order_id in order_ids:
+                order = self._approve(c, order_id, admin_id, sell_product)
+                if order:
+                    approved.append(order)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return approved
+
+    def reject_order(self, order_id, admin_id):
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''UPDATE orders SET status = 'rejected',
+                     admin_action_date = CURRENT_TIMESTAMP, admin_id = ?
+                     WHERE order_id = ? AND status IN ('pending', 'waiting_approval')''', (admin_id, order_id))
+        order = None
+        if c.rowcount:
+            order = c.execute('''SELECT * FROM orders WHERE order_id = ?''', (order_id,)).fetchone()
+            self._complete_review(c, order_id, admin_id)
+        conn.commit()
+        conn.close()
+        return order
+
+    def expire_stale_orders(self, timeout_minutes, now=None):
+        conn = self._connect()
+        c = conn.cursor()
+        cutoff = (now or 'now', f'-{int(timeout_minutes)} minutes')
+        # Select aur update ke beech koi screenshot submit na kar de
+        c.execute('BEGIN IMMEDIATE')
+        expired = c.execute('''SELECT order_id, user_id FROM orders WHERE status = 'pending'
+                               AND order_date < datetime(?, ?)''', cutoff).fetchall()
+        c.execute('''UPDATE orders SET status = 'expired' WHERE status = 'pending'
+                     AND order_date < datetime(?, ?)''', cutoff)
+        conn.commit()
+        conn.close()
+        return expired
+
+    def get_pending_orders(self):
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''SELECT * FROM orders WHERE status = 'waiting_approval'
+                     ORDER BY order_date''')
+        orders = c.fetchall()
+        conn.close()
+        return orders
+
+    def get_active_order(self, user_id):
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''SELECT * FROM orders WHERE user_id = ? AND
+                     (status = 'pending' OR status = 'waiting_approval')
+                     ORDER BY order_date DESC, rowid DESC LIMIT 1''', (user_id,))
+        order = c.fetchone()
+        conn.close()
+        return order
+
+    def get_order_by_id(self, order_id):
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''SELECT * FROM orders WHERE order_id = ?''', (order_id,))
+        order = c.fetchone()
+        conn.close()
+        return order
+
+    def get_user_orders(self, user_id, limit=10):
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''SELECT * FROM orders WHERE user_id = ?
+                     ORDER BY order_date DESC, rowid DESC LIMIT ?''', (user_id, limit))
+        orders = c.fetchall()
+        conn.close()
+        return orders
+
+    def get_stats(self):
+        conn = self._connect()
+        c = conn.cursor()
+
+        stats = {}
+        c.execute('''SELECT COUNT(*) FROM products''')
+        stats['total_products'] = c.fetchone()[0]
+
+        c.execute('''SELECT COUNT(*) FROM products WHERE sold = 0''')
+        stats['available_products'] = c.fetchone()[0]
+
+        c.execute('''SELECT COUNT(*) FROM products WHERE sold = 1''')
+        stats['sold_products'] = c.fetchone()[0]
+
+        c.execute('''SELECT COUNT(*) FROM orders''')
+        stats['total_orders'] = c.fetchone()[0]
+
+        c.execute('''SELECT COUNT(*) FROM orders WHERE status = 'approved' ''')
+        stats['approved_orders'] = c.fetchone()[0]
+
+        c.execute('''SELECT COUNT(*) FROM orders WHERE status = 'waiting_approval' ''')
+        stats['pending_orders'] = c.fetchone()[0]
+
+        c.execute('''SELECT SUM(amount) FROM orders WHERE status = 'approved' ''')
+        stats['total_revenue'] = c.fetchone()[0] or 0
+
+        c.execute('''SELECT COUNT(*) FROM users''')
+        stats['total_users'] = c.fetchone()[0]
+
+        conn.close()
+        return stats
+
+    def get_all_users(self):
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''SELECT * FROM users ORDER BY join_date DESC''')
+        users = c.fetchall()
+        conn.close()
+        return users
+
+    def get_user_count(self):
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''SELECT COUNT(*) FROM users''')
+        count = c.fetchone()[0]
+        conn.close()
+        return count
+
+    def get_top_users(self, limit=10):
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''SELECT * FROM users ORDER BY total_spent DESC LIMIT ?''', (limit,))
+        users = c.fetchall()
+        conn.close()
+        return users
+
+    def get_recent_users(self, limit=10):
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''SELECT * FROM users ORDER BY join_date DESC LIMIT ?''', (limit,))
+        users = c.fetchall()
+        conn.close()
+        return users
+
+    def iter_users(self, chunk_size=500):
+        conn = self._connect()
+        c = conn.cursor()
+        last_user_id = None
+        try:
+            while True:
+                if last_user_id is None:
+                    c.execute('''SELECT * FROM users ORDER BY user_id LIMIT ?''', (chunk_size,))
+                else:
+                    c.execute('''SELECT * FROM users WHERE user_id > ?
+                                 ORDER BY user_id LIMIT ?''', (last_user_id, chunk_size))
+                rows = c.fetchall()
+                if not rows:
+                    break
+                yield rows
+                last_user_id = rows[-1][0]
+        finally:
+            conn.close()
+
+    def add_screenshot_hash(self, order_id, user_id, hash_value):
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''INSERT INTO screenshot_hashes (order_id, user_id, hash)
+                     VALUES (?, ?, ?)''', (order_id, user_id, f"{hash_value:016x}"))
+        conn.commit()
+        conn.close()
+
+    def iter_screenshot_hashes(self, chunk_size=5000):
+        conn = self._connect()
+        c = conn.cursor()
+        last_id = 0
+        try:
+            while True:
+                c.execute('''SELECT id, order_id, user_id, hash FROM screenshot_hashes
+                             WHERE id > ? ORDER BY id LIMIT ?''', (last_id, chunk_size))
+                rows = c.fetchall()
+                if not rows:
+                    break
+                yield [(order_id, user_id, int(hash_hex, 16)) for _, order_id, user_id, hash_hex in rows]
+                last_id = rows[-1][0]
+        finally:
+            conn.close()
+
+    def get_categories(self):
+        conn = self._connect()
+        c = conn.cursor()
+        # Index par skip-scan: har category ke liye ek seek, sold history kitni bhi ho
+        c.execute('''WITH RECURSIVE cats(category) AS (
+                         SELECT MIN(category) FROM products
+                         UNION ALL
+                         SELECT (SELECT MIN(category) FROM products WHERE category > cats.category)
+                         FROM cats WHERE cats.category IS NOT NULL)
+                     SELECT category FROM cats WHERE category IS NOT NULL''')
+        categories = [row[0] for row in c.fetchall()]
+        conn.close()
+        return categories
+
+    def add_restock_subscription(self, user_id, category):
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''INSERT OR IGNORE INTO restock_subscriptions (category, user_id)
+                     VALUES (?, ?)''', (category, user_id))
+        added = c.rowcount == 1
+        conn.commit()
+        conn.close()
+        return added
+
+    def get_restock_subscribers(self, category, after_user_id=0, limit=500):
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''SELECT user_id FROM restock_subscriptions
+                     WHERE category = ? AND user_id > ?
+                     ORDER BY user_id LIMIT ?''', (category, after_user_id, limit))
+        user_ids = [row[0] for row in c.fetchall()]
+        conn.close()
+        return user_ids
+
+    def remove_restock_subscriptions(self, category, user_ids):
+        conn = self._connect()
+        c = conn.cursor()
+        c.executemany('''DELETE FROM restock_subscriptions WHERE category = ? AND user_id = ?''',
+                      [(category, user_id) for user_id in user_ids])
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def _complete_review(c, order_id, reviewer_id):
+        c.execute('''UPDATE order_reviews SET reviewer_id = ?,
+                     claimed_date = COALESCE(claimed_date, CURRENT_TIMESTAMP),
+                     completed_date = CURRENT_TIMESTAMP, lease_expires = NULL
+                     WHERE order_id = ? AND completed_date IS NULL''', (reviewer_id, order_id))
+
+    def _next_claimable(self, c, reviewer_id):
+        """Reviewer ka apna active lease pehle, warna sabse purana free order"""
+        return c.execute('''SELECT order_id, submitted_date, COALESCE(reviewer_id = ?, 0) FROM order_reviews
+                             WHERE completed_date IS NULL AND (reviewer_id IS NULL
+                                   OR reviewer_id = ? OR lease_expires < CURRENT_TIMESTAMP)
+                             ORDER BY COALESCE(reviewer_id = ?, 0) DESC, submitted_date LIMIT 1''',
+                          (reviewer_id, reviewer_id, reviewer_id)).fetchone()
+
+    def peek_next_claimable(self, reviewer_id):
+        """(own_lease, submitted_date) of next claimable order, ya None"""
+        conn = self._connect()
+        row = self._next_claimable(conn.cursor(), reviewer_id)
+        conn.close()
+        return (row[2], row[1]) if row else None
+
+    def claim_next_order(self, reviewer_id, lease_seconds):
+        conn = self._connect()
+        conn.isolation_level = None
+        c = conn.cursor()
+        try:
+            # Write lock pehle - do reviewers kabhi same order nahi utha sakte
+            c.execute('BEGIN IMMEDIATE')
+            row = self._next_claimable(c, reviewer_id)
+            if row is None:
+                c.execute('COMMIT')
+                return None
+            # Apna hi lease dobara mila toh claimed_date wahi rahe (wait stats sahi)
+            c.execute('''UPDATE order_reviews SET reviewer_id = ?,
+                         claimed_date = CASE WHEN reviewer_id = ? THEN claimed_date ELSE CURRENT_TIMESTAMP END,
+                         lease_expires = datetime('now', ?) WHERE order_id = ?''',
+                      (reviewer_id, reviewer_id, f'+{int(lease_seconds)} seconds', row[0]))
+            order = c.execute('''SELECT * FROM orders WHERE order_id = ?''', (row[0],)).fetchone()
+            c.execute('COMMIT')
+            return order
+        except Exception:
+            if conn.in_transaction:
+                c.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def claim_order(self, order_id, reviewer_id, lease_seconds):
+        conn = self._connect()
+        c = conn.cursor()
+        # Ek hi UPDATE statement - atomic check-and-set
+        c.execute('''UPDATE order_reviews SET reviewer_id = ?,
+                     claimed_date = CASE WHEN reviewer_id = ? THEN claimed_date ELSE CURRENT_TIMESTAMP END,
+                     lease_expires = datetime('now', ?)
+                     WHERE order_id = ? AND completed_date IS NULL AND (reviewer_id IS NULL
+                           OR reviewer_id = ? OR lease_expires < CURRENT_TIMESTAMP)''',
+                  (reviewer_id, reviewer_id, f'+{int(lease_seconds)} seconds', order_id, reviewer_id))
+        claimed = c.rowcount == 1
+        conn.commit()
+        conn.close()
+        return claimed
+
+    def get_review_queue(self):
+        conn = self._connect()
+        c = conn.cursor()
+        waiting, oldest = c.execute('''SELECT COUNT(*),
+                                         (julianday('now') - julianday(MIN(submitted_date))) * 86400
+                                         FROM order_reviews WHERE completed_date IS NULL''').fetchone()
+        conn.close()
+        return {'waiting': waiting, 'oldest_wait_seconds': oldest or 0}
+
+    def get_reviewer_stats(self):
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''SELECT reviewer_id, COUNT(*),
+                     SUM(julianday(claimed_date) - julianday(submitted_date)) * 86400,
+                     SUM(julianday(completed_date) - julianday(claimed_date)) * 86400
+                     FROM order_reviews WHERE completed_date IS NOT NULL
+                     GROUP BY reviewer_id''')
+        stats = c.fetchall()
+        conn.close()
+        return stats
+
+# ====================
+# IN-MEMORY
+# ====================
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def _utc_now(offset_seconds=0, now=None):
+    """SQLite CURRENT_TIMESTAMP jaisa UTC timestamp string (now diya toh usse offset)"""
+    base = datetime.strptime(now, TIMESTAMP_FORMAT) if now else datetime.now(timezone.utc)
+    return (base + timedelta(seconds=offset_seconds)).strftime(TIMESTAMP_FORMAT)
+
+def _seconds_between(start, end):
+    return (datetime.strptime(end, TIMESTAMP_FORMAT) - datetime.strptime(start, TIMESTAMP_FORMAT)).total_seconds()
+
+class MemoryStorage(Storage):
+    """Pure in-memory engine - tests aur benchmarks ke liye, restart par sab khatam"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.init_database()
+
+    def init_database(self):
+        with self._lock:
+            if hasattr(self, '_products'):
+                return False
+            self._products = {}          # id -> [id, data, category, price, sold, added_date]
+            self._product_by_data = {}   # product_data -> id
+            self._orders = {}            # order_id -> [11 order fields]
+            self._order_seq = {}         # order_id -> insert sequence (rowid jaisa)
+            self._user_orders = {}       # user_id -> [order_id, ...] insert order mein
+            self._users = {}             # user_id -> [6 user fields]
+            self._hashes = []            # (order_id, user_id, hash)
+            self._reviews = {}           # order_id -> [submitted, reviewer_id, claimed, lease_expires, completed]
+            self._subscriptions = {}     # category -> {user_id: created_date}
+            self._next_product_id = 1
+            return True
+
+    def add_product(self, product_data, category="General", price=50):
+        with self._lock:
+            if product_data in self._product_by_data:
+                return None
+            product_id = self._next_product_id
+            self._next_product_id += 1
+            self._products[product_id] = [product_id, product_data, category, price, 0, _utc_now()]
+            self._product_by_data[product_data] = product_id
+            return product_id
+
+    def get_available_products(self):
+        with self._lock:
+            return [(p[0], p[1], p[2], p[3]) for p in self._products.values() if p[4] == 0]
+
+    def get_product_by_id(self, product_id):
+        with self._lock:
+            product = self._products.get(product_id)
+            return tuple(product) if product else None
+
+    def mark_product_sold(self, product_id):
+        with self._lock:
+            product = self._products.get(product_id)
+            if product is None or product[4]:
+                return False
+            product[4] = 1
+            return True
+
+    def create_order(self, order_id, user_id, username, product_id, product_data, amount, order_date=None):
+        with self._lock:
+            if order_id in self._orders:
+                raise sqlite3.IntegrityError("UNIQUE constraint failed: orders.order_id")
+            order = [order_id, user_id, username, product_id, product_data, amount,
+                     None, 'pending', order_date or _utc_now(), None, None]
+            self._orders[order_id] = order
+            self._order_seq[order_id] = len(self._order_seq)
+            self._user_orders.setdefault(user_id, []).append(order_id)
+            if user_id not in self._users:
+                self._users[user_id] = [user_id, username, None, _utc_now(), 0, 0]
+            return tuple(order)
+
+    def update_order_screenshot(self, order_id, screenshot_id):
+        with self._lock:
+            order = self._orders.get(order_id)
+            if order is None or order[7] != 'pending':
+                return None
+            order[6] = screenshot_id
+            order[7] = 'waiting_approval'
+            self._reviews[order_id] = [_utc_now(), None, None, None, None]
+            return tuple(order)
+
+    def _approve(self, order_id, admin_id):
+        """Lock ke andar guarded approve - na ho sake toh None"""
+        order = self._orders.get(order_id)
+        if order is None or order[7] != 'waiting_approval':
+            return None
+        product = self._products.get(order[3])
+        if product is None or product[4]:
+            return None
+        product[4] = 1
+        order[7] = 'approved'
+        order[9] = _utc_now()
+        order[10] = admin_id
+        user = self._users.get(order[1])
+        if user:
+            user[4] += 1
+            user[5] += order[5]
+        self._complete_review(order_id, admin_id)
+        return tuple(order)
+
+    def approve_order(self, order_id, admin_id):
+        with self._lock:
+            return self._approve(order_id, admin_id)
+
+    def approve_orders(self, order_ids, admin_id):
+        with self._lock:
+            approved = [self._approve(order_id, admin_id) for order_id in order_ids]
+        return [order for order in approved if order]
+
+    def reject_order(self, order_id, admin_id):
+        with self._lock:
+            order = self._orders.get(order_id)
+            if order is None or order[7] not in ('pending', 'waiting_approval'):
+                return None
+            order[7] = 'rejected'
+            order[9] = _utc_now()
+            order[10] = admin_id
+            self._complete_review(order_id, admin_id)
+            return tuple(order)
+
+    def expire_stale_orders(self, timeout_minutes, now=None):
+        cutoff = _utc_now(-int(timeout_minutes) * 60, now)
+        with self._lock:
+            expired = []
+            for order in self._orders.values():
+                if order[7] == 'pending' and order[8] < cutoff:
+                    order[7] = 'expired'
+                    expired.append((order[0], order[1]))
+            return expired
+
+    def get_pending_orders(self):
+        with self._lock:
+            orders = [tuple(o) for o in self._orders.values() if o[7] == 'waiting_approval']
+        return sorted(orders, key=lambda o: o[8])
+
+    def get_active_order(self, user_id):
+        with self._lock:
+            active = [self._orders[oid] for oid in self._user_orders.get(user_id, ())
+                      if self._orders[oid][7] in ('pending', 'waiting_approval')]
+            if not active:
+                return None
+            return tuple(max(active, key=lambda o: (o[8], self._order_seq[o[0]])))
+
+    def get_order_by_id(self, order_id):
+        with self._lock:
+            order = self._orders.get(order_id)
+            return tuple(order) if order else None
+
+    def get_user_orders(self, user_id, limit=10):
+        with self._lock:
+            orders = [self._orders[oid] for oid in self._user_orders.get(user_id, ())]
+            orders.sort(key=lambda o: (o[8], self._order_seq[o[0]]), reverse=True)
+            return [tuple(o) for o in orders[:limit]]
+
+    def get_stats(self):
+        with self._lock:
+            products = list(self._products.values())
+            orders = list(self._orders.values())
+            approved = [o for o in orders if o[7] == 'approved']
+            return {
+                'total_products': len(products),
+                'available_products': sum(1 for p in products if p[4] == 0),
+                'sold_products': sum(1 for p in products if p[4] == 1),
+                'total_orders': len(orders),
+                'approved_orders': len(approved),
+                'pending_orders': sum(1 for o in orders if o[7] == 'waiting_approval'),
+                'total_revenue': sum(o[5] for o in approved),
+                'total_users': len(self._users),
+            }
+
+    def get_all_users(self):
+        with self._lock:
+            users = [tuple(u) for u in self._users.values()]
+        return sorted(users, key=lambda u: u[3], reverse=True)
+
+    def get_user_count(self):
+        with self._lock:
+            return len(self._users)
+
+    def get_top_users(self, limit=10):
+        with self._lock:
+            return heapq.nlargest(limit, (tuple(u) for u in self._users.values()), key=lambda u: u[5])
+
+    def get_recent_users(self, limit=10):
+        with self._lock:
+            return heapq.nlargest(limit, (tuple(u) for u in self._users.values()), key=lambda u: u[3])
+
+    def iter_users(self, chunk_size=500):
+        with self._lock:
+            user_ids = sorted(self._users)
+        for start in range(0, len(user_ids), chunk_size):
+            with self._lock:
+                rows = [tuple(self._users[uid]) for uid in user_ids[start:start + chunk_size]]
+            yield rows
+
+    def add_screenshot_hash(self, order_id, user_id, hash_value):
+        with self._lock:
+            self._hashes.append((order_id, user_id, hash_value))
+
+    def iter_screenshot_hashes(self, chunk_size=5000):
+        with self._lock:
+            hashes = list(self._hashes)
+        for start in range(0, len(hashes), chunk_size):
+            yield hashes[start:start + chunk_size]
+
+    def get_categories(self):
+        with self._lock:
+            return sorted({p[2] for p in self._products.values()})
+
+    def add_restock_subscription(self, user_id, category):
+        with self._lock:
+            subscribers = self._subscriptions.setdefault(category, {})
+            if user_id in subscribers:
+                return False
+            subscribers[user_id] = _utc_now()
+            return True
+
+    def get_restock_subscribers(self, category, after_user_id=0, limit=500):
+        with self._lock:
+            user_ids = [uid for uid in self._subscriptions.get(category, ()) if uid > after_user_id]
+        return heapq.nsmallest(limit, user_ids)
+
+    def remove_restock_subscriptions(self, category, user_ids):
+        with self._lock:
+            subscribers = self._subscriptions.get(category, {})
+            for user_id in user_ids:
+                subscribers.pop(user_id, None)
+
+    def _complete_review(self, order_id, reviewer_id):
+        review = self._reviews.get(order_id)
+        if review and review[4] is None:
+            now = _utc_now()
+            review[1] = reviewer_id
+            review[2] = review[2] or now
+            review[3] = None
+            review[4] = now
+
+    @staticmethod
+    def _claimable(review, reviewer_id, now):
+        return review[4] is None and (review[1] is None or review[1] == reviewer_id or review[3] < now)
+
+    def claim_next_order(self, reviewer_id, lease_seconds):
+        with self._lock:
+            now = _utc_now()
+            candidates = [(review[1] != reviewer_id, review[0], order_id)
+                          for order_id, review in self._reviews.items()
+                          if self._claimable(review, reviewer_id, now)]
+            if not candidates:
+                return None
+            order_id = min(candidates)[2]
+            review = self._reviews[order_id]
+            if review[1] != reviewer_id:
+                review[2] = now
+            review[1], review[3] = reviewer_id, _utc_now(lease_seconds)
+            return tuple(self._orders[order_id])
+
+    def claim_order(self, order_id, reviewer_id, lease_seconds):
+        with self._lock:
+            now = _utc_now()
+            review = self._reviews.get(order_id)
+            if review is None or not self._claimable(review, reviewer_id, now):
+                return False
+            if review[1] != reviewer_id:
+                review[2] = now
+            review[1], review[3] = reviewer_id, _utc_now(lease_seconds)
+            return True
+
+    def get_review_queue(self):
+        with self._lock:
+            waiting = [review[0] for review in self._reviews.values() if review[4] is None]
+        oldest = _seconds_between(min(waiting), _utc_now()) if waiting else 0
+        return {'waiting': len(waiting), 'oldest_wait_seconds': oldest}
+
+    def get_reviewer_stats(self):
+        totals = {}
+        with self._lock:
+            for submitted, reviewer_id, claimed, _, completed in self._reviews.values():
+                if completed is None:
+                    continue
+                row = totals.setdefault(reviewer_id, [reviewer_id, 0, 0.0, 0.0])
+                row[1] += 1
+                row[2] += _seconds_between(submitted, claimed)
+                row[3] += _seconds_between(claimed, completed)
+        return [tuple(row) for row in totals.values()]
+
+# ====================
+# SHARDED SQLITE
+# ====================
+class ShardedSQLiteStorage(Storage):
+    """Orders aur users ko user_id % N se alag SQLite files mein baant'ta hai.
+
+    Har file ka apna writer lock hota hai, isliye alag users ke writes ek
+    dusre ka wait nahi karte. Products catalog aur screenshot hashes pehli
+    file (catalog shard) mein rehte hain. approve_order do files touch karta
+    hai (order ka shard + catalog), yeh ek transaction nahi hai - pehle catalog
+    mein product sold mark hota hai (double sell nahi), phir order approve;
+    order approve na ho paaye toh product wapas release hota hai.
+    """
+
+    ORDER_SHARD_CACHE_SIZE = 100000
+
+    def __init__(self, paths):
+        if not paths:
+            raise ValueError("At least one shard path required")
+        self.shards = [SQLiteStorage(path) for path in paths]
+        self.catalog = self.shards[0]
+        # order_id -> shard, taaki har order lookup par saari files scan na karni padein
+        self._order_shards = OrderedDict()
+        self._order_shards_lock = threading.Lock()
+
+    def _shard(self, user_id):
+        return self.shards[user_id % len(self.shards)]
+
+    def _remember_order_shard(self, order_id, shard):
+        with self._order_shards_lock:
+            self._order_shards[order_id] = shard
+            if len(self._order_shards) > self.ORDER_SHARD_CACHE_SIZE:
+                self._order_shards.popitem(last=False)
+
+    def _find_order_shard(self, order_id):
+        with self._order_shards_lock:
+            shard = self._order_shards.get(order_id)
+        if shard is not None:
+            return shard
+        for shard in self.shards:
+            if shard.get_order_by_id(order_id):
+                self._remember_order_shard(order_id, shard)
+                return shard
+        return None
+
+    def init_database(self):
+        return any([shard.init_database() for shard in self.shards])
+
+    def add_product(self, product_data, category="General", price=50):
+        return self.catalog.add_product(product_data, category, price)
+
+    def get_available_products(self):
+        return self.catalog.get_available_products()
+
+    def get_product_by_id(self, product_id):
+        return self.catalog.get_product_by_id(product_id)
+
+    def mark_product_sold(self, product_id):
+        return self.catalog.mark_product_sold(product_id)
+
+    def create_order(self, order_id, user_id, username, product_id, product_data, amount, order_date=None):
+        shard = self._shard(user_id)
+        order = shard.create_order(order_id, user_id, username, product_id, product_data, amount, order_date)
+        self._remember_order_shard(order_id, shard)
+        return order
+
+    def update_order_screenshot(self, order_id, screenshot_id):
+        shard = self._find_order_shard(order_id)
+        return shard.update_order_screenshot(order_id, screenshot_id) if shard else None
+
+    def _sell_for(self, shard, order_ids):
+        """Catalog mein orders ke products sold mark karta hai - jo mil gaye unka order_id -> product_id"""
+        sold = {}
+        for order_id in order_ids:
+            order = shard.get_order_by_id(order_id)
+            if order and order[7] == 'waiting_approval' and self.catalog.mark_product_sold(order[3]):
+                sold[order_id] = order[3]
+        return sold
+
+    def approve_order(self, order_id, admin_id):
+        approved = self.approve_orders([order_id], admin_id)
+        return approved[0] if approved else None
+
+    def approve_orders(self, order_ids, admin_id):
+        # Har shard ka ek transaction; products catalog mein pehle claim hote hain
+        by_shard = {}
+        for order_id in order_ids:
+            shard = self._find_order_shard(order_id)
+            if shard is not None:
+                by_shard.setdefault(id(shard), (shard, []))[1].append(order_id)
+
+        approved = []
+        for shard, shard_order_ids in by_shard.values():
+            if shard is self.catalog:
+                approved.extend(shard.approve_orders(shard_order_ids, admin_id))
+                continue
+            sold = self._sell_for(shard, shard_order_ids)
+            orders = shard.approve_orders(list(sold), admin_id, sell_product=False)
+            for order in orders:
+                del sold[order[0]]
+            # Beech mein order reject / expire ho gaya - product wapas available
+            for product_id in sold.values():
+                self.catalog.release_product(product_id)
+            approved.extend(orders)
+        return approved
+
+    def reject_order(self, order_id, admin_id):
+        shard = self._find_order_shard(order_id)
+        return shard.reject_order(order_id, admin_id) if shard else None
+
+    def expire_stale_orders(self, timeout_minutes, now=None):
+        expired = []
+        for shard in self.shards:
+            expired.extend(shard.expire_stale_orders(timeout_minutes, now))
+        return expired
+
+    def get_pending_orders(self):
+        return list(heapq.merge(*(shard.get_pending_orders() for shard in self.shards),
+                                key=lambda o: o[8]))
+
+    def get_active_order(self, user_id):
+        return self._shard(user_id).get_active_order(user_id)
+
+    def get_order_by_id(self, order_id):
+        shard = self._find_order_shard(order_id)
+        return shard.get_order_by_id(order_id) if shard else None
+
+    def get_user_orders(self, user_id, limit=10):
+        return self._shard(user_id).get_user_orders(user_id, limit)
+
+    def get_stats(self):
+        # Non-catalog shards ki products table khali hai, isliye seedha jod sakte hain
+        stats = dict.fromkeys(STATS_KEYS, 0)
+        for shard in self.shards:
+            for key, value in shard.get_stats().items():
+                stats[key] += value
+        return stats
+
+    def get_all_users(self):
+        users = []
+        for shard in self.shards:
+            users.extend(shard.get_all_users())
+        return sorted(users, key=lambda u: u[3], reverse=True)
+
+    def get_user_count(self):
+        return sum(shard.get_user_count() for shard in self.shards)
+
+    def get_top_users(self, limit=10):
+        users = []
+        for shard in self.shards:
+            users.extend(shard.get_top_users(limit))
+        return heapq.nlargest(limit, users, key=lambda u: u[5])
+
+    def get_recent_users(self, limit=10):
+        users = []
+        for shard in self.shards:
+            users.extend(shard.get_recent_users(limit))
+        return heapq.nlargest(limit, users, key=lambda u: u[3])
+
+    def iter_users(self, chunk_size=500):
+        # Shards ko user_id order mein merge karke baaki engines jaise chunks
+        users = heapq.merge(*((u for rows in shard.iter_users(chunk_size) for u in rows)
+                              for shard in self.shards), key=lambda u: u[0])
+        chunk = []
+        for user in users:
+            chunk.append(user)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def add_screenshot_hash(self, order_id, user_id, hash_value):
+        self.catalog.add_screenshot_hash(order_id, user_id, hash_value)
+
+    def get_categories(self):
+        return self.catalog.get_categories()
+
+    def add_restock_subscription(self, user_id, category):
+        return self.catalog.add_restock_subscription(user_id, category)
+
+    def get_restock_subscribers(self, category, after_user_id=0, limit=500):
+        return self.catalog.get_restock_subscribers(category, after_user_id, limit)
+
+    def remove_restock_subscriptions(self, category, user_ids):
+        self.catalog.remove_restock_subscriptions(category, user_ids)
+
+    def iter_screenshot_hashes(self, chunk_size=5000):
+        return self.catalog.iter_screenshot_hashes(chunk_size)
+
+    def claim_next_order(self, reviewer_id, lease_seconds):
+        # Apna lease pehle, phir sabse purana order - har shard ka claim khud atomic hai
+        candidates = []
+        for shard in self.shards:
+            peek = shard.peek_next_claimable(reviewer_id)
+            if peek:
+                candidates.append((-peek[0], peek[1], id(shard), shard))
+        for *_, shard in sorted(candidates):
+            order = shard.claim_next_order(reviewer_id, lease_seconds)
+            if order:
+                return order
+        return None
+
+    def claim_order(self, order_id, reviewer_id, lease_seconds):
+        shard = self._find_order_shard(order_id)
+        return shard.claim_order(order_id, reviewer_id, lease_seconds) if shard else False
+
+    def get_review_queue(self):
+        queues = [shard.get_review_queue() for shard in self.shards]
+        return {
+            'waiting': sum(q['waiting'] for q in queues),
+            'oldest_wait_seconds': max(q['oldest_wait_seconds'] for q in queues),
+        }
+
+    def get_reviewer_stats(self):
+        totals = {}
+        for shard in self.shards:
+            for reviewer_id, completed, wait, handle in shard.get_reviewer_stats():
+                row = totals.setdefault(reviewer_id, [reviewer_id, 0, 0.0, 0.0])
+                row[1] += completed
+                row[2] += wait or 0
+                row[3] += handle or 0
+        return [tuple(row) for row in totals.values()]